@@ -1,212 +1,523 @@
 import asyncio
+import errno
+import os
+import time
 from abc import ABC, abstractmethod
 from contextlib import suppress
-from typing import Any, Coroutine, Optional
+from functools import partial
+from itertools import pairwise
+from pathlib import Path
+from typing import Any, Coroutine, Optional, Union
 
-from app.builtin import process_builtin
-from app.command import CommandFull, CommandOne
-from app.exceptions import NotBuildinError
-from app.service_functions import writeln
-from app.types import CommandResult, CommandResultAsyncIterator
+from app.builtin import BuiltinHandler, get_builtin_handler, is_builtin
+from app.command import CommandChain, CommandFull, CommandOne
+from app.coreutils import do_true
+from app.exceptions import CommandNotFoundError, EmptyCommandError, NotBuildinError, RedirectionError
+from app.jobs import Job, current_job, terminal
+from app.pipe_buffer import PIPE_HIGH_WATER, PIPE_LOW_WATER, OutputBuffer, PipeBuffer
+from app.redirection import Redirections
+from app.status import CANNOT_EXECUTE_STATUS, FAILURE_STATUS, INTERRUPTED_STATUS, NOT_FOUND_STATUS, exit_status
+from app.subshell import Subshell, subshell_directory
+from app.substitution import CaptureBuffer, expand_substitutions, parse_substitution, substitution_lines
+from app.sync_command_processor import capture_sync, is_builtin_line
+from app.tracing import PipelineStats, tracer
+from app.types import BuiltinOutput, StdinIterator, StreamResultAsyncIterator
+from app.wildcard import expand_command
 
 ProcessCoroutine = Coroutine[Any, Any, asyncio.subprocess.Process]
+SYSTEM_SHELL = "/bin/sh"
+CHUNK_SIZE = 1 << 16
 
 
-class ProcessBundle(ABC):
+async def _report_error(message: str, command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    yield None, message
+
+
+class ProcessBundle(ABC):  # noqa: WPS214
     """ProcessBundle"""
 
-    def __init__(self) -> None:
+    def __init__(self, redirections: Redirections) -> None:
         super().__init__()
-        self.stdout_task: Optional[asyncio.Task[bytes]] = None
-        self.stderr_task: Optional[asyncio.Task[bytes]] = None
-
-    def is_stdout(self, task: asyncio.Task[bytes]) -> bool:
-        return task == self.stdout_task
+        self.redirections = redirections
 
     @classmethod
     def from_command(cls, command: CommandOne) -> "ProcessBundle":
         try:
-            stdout_str, stderr_str = process_builtin(command)
-        except NotBuildinError:
-            return ExecProcessBundle(command)
-        else:
-            return BuiltinProcessBundle(stdout_str, stderr_str)
+            command = expand_command(command, is_exec=not is_builtin(command))
+        except OSError as error:
+            too_long = partial(_report_error, f"bash: {command[0]}: {error.strerror}\n")
+            return BuiltinProcessBundle(too_long, command, Redirections(), CANNOT_EXECUTE_STATUS)
+        try:
+            redirections = Redirections.open(command)
+        except RedirectionError as error:
+            return BuiltinProcessBundle(partial(_report_error, str(error)), command, Redirections())
+        try:
+            handler = get_builtin_handler(command)
+        except NotBuildinError as error:
+            return ExecProcessBundle(command, error.file_path, redirections)
+        except CommandNotFoundError:
+            not_found = partial(_report_error, f"{command[0]}: command not found\n")
+            return BuiltinProcessBundle(not_found, command, redirections, NOT_FOUND_STATUS)
+        return BuiltinProcessBundle(handler, command, redirections)
 
     @abstractmethod
     async def activate(self) -> None: ...
     @abstractmethod
-    async def write_stdin(self, line: bytes) -> None: ...
+    async def wait(self) -> None: ...
+    @abstractmethod
+    async def write_stdin(self, chunk: bytes) -> None: ...
     @abstractmethod
     async def close_stdin(self) -> None: ...
     @abstractmethod
-    def recreate(self, is_stdout: bool) -> asyncio.Task[bytes]: ...
+    def accepts_stdin(self) -> bool: ...
+    @abstractmethod
+    def close_stdout(self) -> None: ...
+    @abstractmethod
+    def returncode(self) -> int: ...
 
+    def pid(self) -> Optional[int]:  # noqa: WPS324
+        return None  # noqa: WPS324
 
-class BuiltinProcessBundle(ProcessBundle):
-    def __init__(self, stdout_str: Optional[str], stderr_str: Optional[str]) -> None:
-        super().__init__()
-        self.stdout_str = stdout_str
-        if stdout_str is not None:
-            self.stdout_task = asyncio.create_task(asyncio.sleep(0, stdout_str.encode()))
-        self.stderr_str = stderr_str
-        if stderr_str is not None:
-            self.stderr_task = asyncio.create_task(asyncio.sleep(0, stderr_str.encode()))
+    def close(self) -> None:
+        self.redirections.close()
 
-    async def activate(self) -> None: ...
-    async def write_stdin(self, line: bytes) -> None: ...
-    async def close_stdin(self) -> None: ...
 
-    def recreate(self, is_stdout: bool) -> asyncio.Task[bytes]:
-        task = asyncio.create_task(asyncio.sleep(0, b""))
-        if is_stdout:
-            self.stdout_task = task
-        else:
-            self.stderr_task = task
-        return task
+class BuiltinProcessBundle(ProcessBundle):  # noqa: WPS214, WPS230
+    """Runs a builtin as an async generator connected to the pipeline through bounded buffers.
 
+    The builtin pulls its stdin and its output is only produced as fast as the
+    next stage consumes it. Its stdout and stderr share one buffer, so they go
+    on in the order it wrote them. Whatever reaches stdin after the builtin is
+    done is dropped, like writes to a process that has exited. A builtin fails
+    with error_status as soon as it writes to stderr. When the next stage
+    stops reading, the builtin is cancelled like a process killed by SIGPIPE.
+    """
 
-class ExecProcessBundle(ProcessBundle):
-    def __init__(self, command: CommandOne) -> None:
-        super().__init__()
-        self.coroutine: ProcessCoroutine = asyncio.create_subprocess_shell(
-            command.text,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
+    def __init__(
+        self,
+        handler: BuiltinHandler,
+        command: CommandOne,
+        redirections: Redirections,
+        error_status: int = FAILURE_STATUS,
+    ) -> None:
+        super().__init__(redirections)
+        self.handler = handler
+        self.command = command
+        self.error_status = error_status
+        self.status = 0
+        self.stdin_buffer = PipeBuffer()
+        self.output_buffer = OutputBuffer()
+        self.task: Optional[asyncio.Task[None]] = None
 
     async def activate(self) -> None:
-        self.process = await self.coroutine
-        self.process_task = asyncio.create_task(self.process.wait())
-        self.stdout_task = (
-            asyncio.create_task(self.process.stdout.readline()) if self.process.stdout else None
-        )
-        self.stderr_task = (
-            asyncio.create_task(self.process.stderr.readline()) if self.process.stderr else None
+        self.task = asyncio.create_task(self._run())
+
+    async def wait(self) -> None:
+        if self.task is None:
+            return
+        await asyncio.wait((self.task,))
+        if not self.task.cancelled():
+            self.task.result()
+
+    async def write_stdin(self, chunk: bytes) -> None:
+        await self.stdin_buffer.put(chunk)
+
+    async def close_stdin(self) -> None:
+        self.stdin_buffer.close()
+
+    def accepts_stdin(self) -> bool:
+        return not self.stdin_buffer.is_discarding
+
+    def close_stdout(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+
+    def returncode(self) -> int:
+        return self.status
+
+    def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+        super().close()
+
+    async def _read_stdin(self) -> StdinIterator:
+        while chunk := await self.stdin_buffer.get():
+            yield chunk
+
+    async def _run(self) -> None:
+        try:  # noqa: WPS501
+            async for stdout_str, stderr_str in self.handler(self.command, self._read_stdin()):
+                await self._put_output(stdout_str, stderr_str)
+        finally:
+            self._finish()
+
+    async def _put_output(self, stdout_str: Union[str, bytes, None], stderr_str: Optional[str]) -> None:
+        if isinstance(stdout_str, str):
+            stdout_str = os.fsencode(stdout_str)
+        if stdout_str:
+            await self.output_buffer.put(stdout_str, is_stdout=True)
+        if stderr_str:
+            self.status = self.error_status
+            await self.output_buffer.put(os.fsencode(stderr_str), is_stdout=False)
+
+    def _finish(self) -> None:
+        self.stdin_buffer.discard()
+        self.output_buffer.close()
+
+
+class ExecProcessBundle(ProcessBundle):  # noqa: WPS214, WPS230
+    def __init__(self, command: CommandOne, file_path: Path, redirections: Redirections) -> None:
+        super().__init__(redirections)
+        self.command = command
+        self.file_path = file_path
+        self.stdin: int = asyncio.subprocess.PIPE
+        self.stdout: int = asyncio.subprocess.PIPE
+        self.stderr: int = asyncio.subprocess.PIPE
+        self.inherited_fds: list[int] = []
+        self.job: Optional[Job] = None
+        self.stdout_reader: Optional[asyncio.StreamReader] = None
+        self.stdout_transport: Optional[asyncio.ReadTransport] = None
+        if redirections.stdout is not None:
+            self.stdout = redirections.stdout.fd
+        if redirections.stderr is not None:
+            self.stderr = redirections.stderr.fd
+
+    def is_piped(self) -> bool:
+        return self.stdout == asyncio.subprocess.PIPE
+
+    def pipe_to(self, next_bundle: "ExecProcessBundle") -> None:
+        read_fd, write_fd = os.pipe()
+        self.stdout = write_fd
+        self.inherited_fds.append(write_fd)
+        next_bundle.stdin = read_fd
+        next_bundle.inherited_fds.append(read_fd)
+
+    async def pipe_to_shell(self) -> None:
+        """Reads stdout through a pipe of our own, so its read end can be closed when the reader is gone."""
+        read_fd, write_fd = os.pipe()
+        self.stdout = write_fd
+        self.inherited_fds.append(write_fd)
+        self.stdout_reader = asyncio.StreamReader()
+        pipe = open(read_fd, "rb", buffering=0)  # noqa: WPS515  # closed with the transport
+        transport, _protocol = await asyncio.get_running_loop().connect_read_pipe(
+            partial(asyncio.StreamReaderProtocol, self.stdout_reader), pipe
         )
+        self.stdout_transport = transport
+
+    async def activate(self) -> None:
+        if self.is_piped():
+            await self.pipe_to_shell()
+        try:
+            self.process = await self._exec()
+        except OSError:
+            self.close_stdout()
+            raise
+        finally:
+            for fd in self.inherited_fds:
+                os.close(fd)
+        if self.process.stdin is not None:
+            self.process.stdin.transport.set_write_buffer_limits(PIPE_HIGH_WATER, PIPE_LOW_WATER)
+
+    async def wait(self) -> None:
+        await self.process.wait()
+        if self.job is not None:
+            self.job.exited(self.process.pid)
+
+    async def read_stdout(self) -> bytes:
+        if self.stdout_reader is None:
+            return b""
+        return await self.stdout_reader.read(CHUNK_SIZE)
 
-    def recreate(self, is_stdout: bool) -> asyncio.Task[bytes]:
-        if is_stdout:
-            if self.process.stdout is None:
-                raise NotImplementedError
-            self.stdout_task = asyncio.create_task(self.process.stdout.readline())
-            return self.stdout_task
+    async def read_stderr(self) -> bytes:
         if self.process.stderr is None:
-            raise NotImplementedError
-        self.stderr_task = asyncio.create_task(self.process.stderr.readline())
-        return self.stderr_task
+            return b""
+        return await self.process.stderr.read(CHUNK_SIZE)
 
-    async def write_stdin(self, line: bytes) -> None:
-        if self.process.stdin:
-            self.process.stdin.write(line)
+    async def write_stdin(self, chunk: bytes) -> None:
+        if self.process.stdin and not self.process.stdin.is_closing():
+            self.process.stdin.write(chunk)
             with suppress(ConnectionError):
                 await self.process.stdin.drain()
 
+    def accepts_stdin(self) -> bool:
+        return self.process.stdin is None or not self.process.stdin.is_closing()
+
+    def close_stdout(self) -> None:
+        # closing the read end makes the next write of the process fail with SIGPIPE
+        if self.stdout_transport is not None:
+            self.stdout_transport.close()
+
+    def close(self) -> None:
+        self.close_stdout()
+        super().close()
+
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def failed(self, error: OSError) -> BuiltinProcessBundle:
+        """A stage reporting why the command could not be executed, in place of this one."""
+        status = NOT_FOUND_STATUS if error.errno == errno.ENOENT else CANNOT_EXECUTE_STATUS
+        message = f"bash: {self.command[0]}: {error.strerror}\n"
+        return BuiltinProcessBundle(partial(_report_error, message), self.command, self.redirections, status)
+
+    def returncode(self) -> int:
+        return exit_status(self.process.returncode or 0)
+
     async def close_stdin(self) -> None:
         if self.process.stdin:
             self.process.stdin.close()
-            await self.process.stdin.wait_closed()
+            with suppress(ConnectionError):
+                await self.process.stdin.wait_closed()
+
+    async def _exec(self) -> asyncio.subprocess.Process:
+        try:
+            return await self._spawn(*self.command.tokens, executable=self.file_path)
+        except OSError as error:
+            if error.errno != errno.ENOEXEC:
+                raise
+        # a script without a shebang line is run by the system shell, like bash does
+        script = str(self.file_path)
+        return await self._spawn(SYSTEM_SHELL, script, *self.command.args, executable=SYSTEM_SHELL)
+
+    def _create(self, *args: str, executable: Path | str) -> ProcessCoroutine:
+        return asyncio.create_subprocess_exec(
+            *args,
+            executable=executable,
+            stdin=self.stdin,
+            stdout=self.stdout,
+            stderr=self.stderr,
+            process_group=None if self.job is None else self.job.process_group(),
+            cwd=subshell_directory(),
+        )
 
+    async def _spawn(self, *args: str, executable: Path | str) -> asyncio.subprocess.Process:
+        if self.job is None:
+            return await self._create(*args, executable=executable)
+        leader = self.job.leader
+        # stages spawned concurrently, like the lines of `parallel`, must not each create a group
+        async with leader.spawn_lock:
+            try:
+                process = await self._create(*args, executable=executable)
+            except PermissionError:
+                if leader.pgid is None:
+                    raise
+                # every earlier stage has exited already, and its process group went with it
+                leader.pgid = None
+                process = await self._create(*args, executable=executable)
+            self.job.add_pid(process.pid)
+        return process
 
-class ProcessTaskGroup:
-    def __init__(self) -> None:
+
+class ProcessTaskGroup:  # noqa: WPS214
+    def __init__(self, job: Optional[Job] = None) -> None:
+        self.job = job
         self.int_to_pb: list[ProcessBundle] = []
-        self.pb_to_int: dict[ProcessBundle, int] = dict()
-        self.stdout_to_pb: dict[asyncio.Task[bytes], ProcessBundle] = dict()
-        self.stderr_to_pb: dict[asyncio.Task[bytes], ProcessBundle] = dict()
+        self.results = OutputBuffer()
+        self.stats: Optional[PipelineStats] = None
+        self.exit_watchers: list[asyncio.Task[None]] = []
 
     def __len__(self) -> int:
         return len(self.int_to_pb)
 
     async def add_process(self, command: CommandOne) -> None:
+        outputs = [await self._capture(line) for line in substitution_lines(command)]  # noqa: WPS476
+        try:
+            command = expand_substitutions(command, outputs)
+        except EmptyCommandError:
+            # no word is left, like for `$(true)`, so the stage runs nothing and succeeds
+            self.int_to_pb.append(BuiltinProcessBundle(do_true, command, Redirections()))
+            return
         process_bundle = ProcessBundle.from_command(command)
-        await process_bundle.activate()
-        index = len(self.int_to_pb)
-        self.pb_to_int[process_bundle] = index
-        if process_bundle.stdout_task is not None:
-            self.stdout_to_pb[process_bundle.stdout_task] = process_bundle
-        if process_bundle.stderr_task is not None:
-            self.stderr_to_pb[process_bundle.stderr_task] = process_bundle
+        if isinstance(process_bundle, ExecProcessBundle):
+            process_bundle.job = self.job
         self.int_to_pb.append(process_bundle)
 
-    def get_readline_tasks(self) -> set[asyncio.Task[bytes]]:
-        result: set[asyncio.Task[bytes]] = set()
-        for pb in self.int_to_pb:
-            if pb.stdout_task:
-                result.add(pb.stdout_task)
-            if pb.stderr_task:
-                result.add(pb.stderr_task)
-        return result
-
-    async def do_the_needful(  # noqa: WPS210
-        self, task: asyncio.Task[bytes], result: bytes
-    ) -> tuple[Optional[CommandResult], asyncio.Task[bytes]]:
-        bundle = self.stdout_to_pb.pop(task, None)
-        is_stdout: bool = True
-        if bundle is None:
-            bundle = self.stderr_to_pb.pop(task, None)
-            is_stdout = False
-            if bundle is None:
-                raise KeyError
-        new_task = bundle.recreate(is_stdout)
-        if is_stdout:
-            self.stdout_to_pb[new_task] = bundle
-        else:
-            self.stderr_to_pb[new_task] = bundle
-        index: int = self.pb_to_int[bundle]
-        if index == len(self) - 1:
-            if is_stdout:
-                to_yield: CommandResult = result.decode(), None
-            else:
-                to_yield = None, result.decode()
-            return to_yield, new_task
-        if is_stdout:
-            next_bundle: ProcessBundle = self.int_to_pb[index + 1]
-            await next_bundle.write_stdin(result)
-        else:
-            writeln(result.decode(), False, None)
-        return None, new_task
+    def connect_os_pipes(self) -> None:
+        for bundle, next_bundle in pairwise(self.int_to_pb):
+            if (
+                isinstance(bundle, ExecProcessBundle)
+                and isinstance(next_bundle, ExecProcessBundle)
+                and bundle.is_piped()
+            ):
+                bundle.pipe_to(next_bundle)
 
-    async def close_next_input(self, task: asyncio.Task[bytes]) -> None:
-        bundle = self.stdout_to_pb.pop(task, None)
-        if bundle is None:
-            self.stderr_to_pb.pop(task, None)
-            return
-        index: int = self.pb_to_int[bundle]
-        if index == len(self) - 1:
+    async def activate(self) -> None:
+        for index, process_bundle in enumerate(self.int_to_pb):
+            started_at = time.perf_counter()
+            try:
+                await process_bundle.activate()  # noqa: WPS476
+            except OSError as error:
+                if not isinstance(process_bundle, ExecProcessBundle):
+                    raise
+                process_bundle = process_bundle.failed(error)
+                self.int_to_pb[index] = process_bundle
+                await process_bundle.activate()  # noqa: WPS476
+            if self.stats is not None:
+                self.stats.spawned(index, process_bundle.pid(), started_at)
+                self.exit_watchers.append(asyncio.create_task(self._watch_exit(index, self.stats)))
+        await self.int_to_pb[0].close_stdin()
+
+    async def wait(self) -> None:
+        if self.exit_watchers:
+            await asyncio.gather(*self.exit_watchers)
             return
-        next_bundle: ProcessBundle = self.int_to_pb[index + 1]
-        await next_bundle.close_stdin()
-
-
-async def _process_done_task(
-    done_task: asyncio.Task[bytes],
-    task_group: ProcessTaskGroup,
-    readline_tasks: set[asyncio.Task[bytes]],
-) -> Optional[CommandResult]:
-    if done_task.cancelled() or done_task.exception() is not None:
-        raise NotImplementedError
-    result = done_task.result()
-    if len(result) > 0:
-        to_yield, new_task = await task_group.do_the_needful(done_task, result)  # noqa: WPS476
-        readline_tasks.add(new_task)
-        return to_yield
-    await task_group.close_next_input(done_task)
-    return None
-
-
-async def process_full(command_full: CommandFull) -> CommandResultAsyncIterator:  # noqa: WPS210
-    task_group = ProcessTaskGroup()
-    for command in command_full.commands:
-        await task_group.add_process(command)  # noqa: WPS476
-    readline_tasks: set[asyncio.Task[bytes]] = task_group.get_readline_tasks()
-    while len(readline_tasks) > 0:
-        done, readline_tasks = await asyncio.wait(
-            readline_tasks, return_when=asyncio.FIRST_COMPLETED
-        )
-        for done_task in done:
-            to_yield = await _process_done_task(  # noqa: WPS476
-                done_task, task_group, readline_tasks
-            )
-            if to_yield:
-                yield to_yield
+        for process_bundle in self.int_to_pb:
+            await process_bundle.wait()  # noqa: WPS476
+
+    def close(self) -> None:
+        for watcher in self.exit_watchers:
+            watcher.cancel()
+        for process_bundle in self.int_to_pb:
+            process_bundle.close()
+
+    async def pump_stdout(self, index: int, bundle: ExecProcessBundle) -> None:
+        while chunk := await bundle.read_stdout():
+            await asyncio.sleep(0)
+            if not await self._forward_stdout(index, chunk):
+                break
+        await self._close_next_stdin(index)
+
+    async def pump_stderr(self, index: int, bundle: ExecProcessBundle) -> None:
+        while chunk := await bundle.read_stderr():
+            await self._forward_stderr(index, chunk)
+
+    async def pump_builtin(self, index: int, bundle: BuiltinProcessBundle) -> None:
+        is_read = True
+        async for stdout, stderr in bundle.output_buffer:
+            await asyncio.sleep(0)
+            if stderr is not None:
+                await self._forward_stderr(index, stderr)
+            elif is_read and stdout:
+                is_read = await self._forward_stdout(index, stdout)
+        await self._close_next_stdin(index)
+
+    def returncode(self) -> int:
+        return self.int_to_pb[-1].returncode() if self.int_to_pb else 0
+
+    def is_interrupted(self) -> bool:
+        """Whether Ctrl-C, which the terminal sends straight to the processes of a job it is lent to, ended them."""
+        if self.job is None or terminal.owner is not self.job.leader:
+            return False
+        return self.returncode() == INTERRUPTED_STATUS
+
+    async def run(self, command_full: CommandFull) -> StreamResultAsyncIterator:
+        try:  # noqa: WPS501
+            async for result in self._stream(command_full):
+                yield result
+        finally:
+            self.close()
+
+    async def drain(self) -> StreamResultAsyncIterator:
+        async for result in self.results:
+            yield result
+
+    async def pump(self) -> None:
+        pumps: list[Coroutine[Any, Any, None]] = []
+        for index, bundle in enumerate(self.int_to_pb):
+            if isinstance(bundle, BuiltinProcessBundle):
+                pumps.append(self.pump_builtin(index, bundle))
+            elif isinstance(bundle, ExecProcessBundle):
+                pumps.append(self.pump_stdout(index, bundle))
+                pumps.append(self.pump_stderr(index, bundle))
+        try:  # noqa: WPS501
+            await asyncio.gather(*pumps)
+        finally:
+            self.results.close()
+
+    async def _stream(self, command_full: CommandFull) -> StreamResultAsyncIterator:
+        if command_full.is_timed or tracer.is_enabled:
+            self.stats = PipelineStats([command.text for command in command_full.commands])
+        for command in command_full.commands:
+            await self.add_process(command)  # noqa: WPS476
+        self.connect_os_pipes()
+        await self.activate()
+        if self.job is not None:
+            self.job.started.set()
+        pump_task = asyncio.create_task(self.pump())
+        try:  # noqa: WPS229, WPS501
+            async for result in self.drain():
+                yield result
+            await pump_task
+        finally:
+            pump_task.cancel()
+        await self.wait()
+        if command_full.is_timed and self.stats is not None:
+            yield None, self.stats.report().encode()
+
+    async def _capture(self, line: str) -> str:
+        """Stdout of a command substitution; one of builtins only is run in place, without a process."""
+        if is_builtin_line(line):
+            return capture_sync(line)
+        if self.job is not None:
+            # a substitution may take long, so a job started with & goes to the background before it runs
+            self.job.started.set()
+        parent = current_job.get()
+        job = Job(line, parent is not None and parent.job_control, parent)
+        buffer = CaptureBuffer()
+        with Subshell(job):
+            for chain in parse_substitution(line) or ():
+                async for result in process_chain(chain, job):
+                    buffer.add(result)
+        return buffer.text()
+
+    def _next_bundle(self, index: int) -> Optional[ProcessBundle]:
+        next_index = index + 1
+        return self.int_to_pb[next_index] if next_index < len(self) else None
+
+    async def _forward_stdout(self, index: int, chunk: bytes) -> bool:
+        """Passes on stdout of stage index; false once the next stage stopped reading."""
+        bundle = self.int_to_pb[index]
+        next_bundle = self._next_bundle(index)
+        if self.stats is not None:
+            self.stats.output(index, len(chunk))
+        if bundle.redirections.stdout is not None:
+            bundle.redirections.stdout.write(chunk)
+            return True
+        if next_bundle is None:
+            await self.results.put(chunk, is_stdout=True)
+            return True
+        started_at = time.perf_counter()
+        await next_bundle.write_stdin(chunk)
+        if self.stats is not None:
+            self.stats.waited(index + 1, time.perf_counter() - started_at)
+        if next_bundle.accepts_stdin():
+            return True
+        # like `yes | head`: the reader is done, so the writer is stopped instead of drained
+        bundle.close_stdout()
+        return False
+
+    async def _forward_stderr(self, index: int, chunk: bytes) -> None:
+        redirection = self.int_to_pb[index].redirections.stderr
+        if redirection is None:
+            await self.results.put(chunk, is_stdout=False)
+        else:
+            redirection.write(chunk)
+
+    async def _close_next_stdin(self, index: int) -> None:
+        next_bundle = self._next_bundle(index)
+        if next_bundle is not None:
+            await next_bundle.close_stdin()
+
+    async def _watch_exit(self, index: int, stats: PipelineStats) -> None:
+        process_bundle = self.int_to_pb[index]
+        await process_bundle.wait()
+        stats.exited(index, process_bundle.returncode())
+
+
+def process_full(command_full: CommandFull, job: Optional[Job] = None) -> StreamResultAsyncIterator:
+    return ProcessTaskGroup(job).run(command_full)
+
+
+async def process_chain(chain: CommandChain, job: Job) -> StreamResultAsyncIterator:
+    """Runs chain with job.status kept at the status of the last pipeline, for an `exit` without a number."""
+    job.status = 0
+    pipelines = chain.pipelines_to_run(lambda: job.status)
+    for pipeline in pipelines:
+        task_group = ProcessTaskGroup(job)
+        async for result in task_group.run(pipeline):
+            yield result
+        job.status = task_group.returncode()
+        if task_group.is_interrupted():
+            # Ctrl-C reached only the processes of the job, so the job is cancelled as if the shell had got it
+            job.leader.interrupt()
+            break
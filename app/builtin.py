@@ -1,61 +1,57 @@
 import os
-import readline
+from pathlib import Path
 from types import MappingProxyType
 from typing import Callable, Mapping
 
-from app.command import CommandOne
+from app.command import TIME_KEYWORD, CommandOne
 from app.command_type import CommandType
-from app.exceptions import ExitError, NotBuildinError
-from app.history import append_history, read_history, write_history
+from app.coreutils import NATIVE_UTILS, Support, do_cat, do_true, supports_cat
+from app.deferred_handler import DeferredHandler
+from app.exceptions import CommandNotFoundError, ExitError, NotBuildinError
+from app.hash_builtin import do_hash
+from app.head_builtin import do_head, supports_head
+from app.printf_builtin import do_printf, supports_printf
 from app.service_functions import find_executable_file, join_or_none
-from app.types import CommandResult
+from app.status import SYNTAX_ERROR_STATUS
+from app.subshell import change_directory, current_directory
+from app.types import BuiltinOutput, StdinIterator
+from app.wc_builtin import do_wc, supports_wc
 
-ArgsHandler = Callable[[CommandOne], CommandResult]
+BuiltinHandler = Callable[[CommandOne, StdinIterator], BuiltinOutput]
+JOB_BUILTINS = "app.job_builtins"
+EXIT_STATUS_MASK = 0xFF
 
 
-def do_cd(command: CommandOne) -> CommandResult:
+async def do_cd(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
     new_dir = command.args[0]
     try:
-        os.chdir(new_dir)
+        change_directory(new_dir)
     except FileNotFoundError:
-        return None, f"cd: {new_dir}: No such file or directory\n"
-    return None, None
+        yield None, f"cd: {new_dir}: No such file or directory\n"
 
 
-def do_echo(command: CommandOne) -> CommandResult:
-    return "{}\n".format(" ".join(command.args)), None
+async def do_echo(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    yield "{}\n".format(" ".join(command.args)), None
 
 
-def do_exit(command: CommandOne) -> CommandResult:
-    raise ExitError
-
-
-def do_history(command: CommandOne) -> CommandResult:
-    if len(command.args) == 2:
-        if command.args[0] == "-r":
-            return read_history(command.args[1])
-        if command.args[0] == "-w":
-            return write_history(command.args[1])
-        if command.args[0] == "-a":
-            return append_history(command.args[1])
-        return None, "NotImplementedError"
-
-    length = readline.get_current_history_length()
-    if len(command.args) > 0:
-        start_index = max(0, length - int(command.args[0]))
-    else:
-        start_index = 0
-    result: list[str] = []
-    for index in range(start_index + 1, length):
-        result.append(f"    {index}  {readline.get_history_item(index)}")
-    result.append(f"    {length}  {command.text}")
-    return join_or_none(result), None
+async def do_exit(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    if not command.args:
+        raise ExitError
+    try:
+        status = int(command.args[0])
+    except ValueError:
+        yield None, f"exit: {command.args[0]}: numeric argument required\n"
+        raise ExitError(SYNTAX_ERROR_STATUS)
+    raise ExitError(status & EXIT_STATUS_MASK)
 
 
-def do_type(command: CommandOne) -> CommandResult:  # noqa: WPS210
+async def do_type(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:  # noqa: WPS210
     stdout_list: list[str] = []
     stderr_list: list[str] = []
     for cmd in command.args:
+        if cmd == TIME_KEYWORD:
+            stdout_list.append(f"{cmd} is a shell keyword")
+            continue
         if cmd in DEFAULT_HANDLERS:
             stdout_list.append(f"{cmd} is a shell builtin")
             continue
@@ -64,31 +60,66 @@ def do_type(command: CommandOne) -> CommandResult:  # noqa: WPS210
             stderr_list.append(f"{cmd}: not found")
         else:
             stdout_list.append(f"{cmd} is {file_path}")
-    return join_or_none(stdout_list), join_or_none(stderr_list)
+    yield join_or_none(stdout_list), join_or_none(stderr_list)
 
 
-def do_pwd(command: CommandOne) -> CommandResult:
-    return "{}\n".format(os.getcwd()), None
+async def do_pwd(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    yield "{}\n".format(current_directory()), None
 
 
-def process_builtin(command: CommandOne) -> CommandResult:
-    handler = DEFAULT_HANDLERS.get(command.cmd_type)
-    if handler is None:
-        file_name = command[0]
-        file_path = find_executable_file(file_name)
-        if file_path is None:
-            return None, f"{file_name}: command not found\n"
-        raise NotBuildinError
-    return handler(command)
+def is_builtin(command: CommandOne) -> bool:
+    """Whether command runs in-process: natives only take the forms they support."""
+    if command.cmd_type not in DEFAULT_HANDLERS:
+        return False
+    supports = NATIVE_SUPPORT.get(command.cmd_type)
+    return supports is None or supports(command.args)
+
 
+def get_builtin_handler(command: CommandOne) -> BuiltinHandler:
+    handler = DEFAULT_HANDLERS.get(command.cmd_type) if is_builtin(command) else None
+    if handler is not None:
+        return handler
+    if os.sep in command[0]:
+        # a path is executed as it is, so exec reports why it cannot be, like bash does
+        raise NotBuildinError(Path(current_directory(), command[0]))
+    file_path = find_executable_file(command[0], count_hit=True)
+    if file_path is None:
+        raise CommandNotFoundError(command[0])
+    raise NotBuildinError(file_path)
 
-DEFAULT_HANDLERS: Mapping[str, ArgsHandler] = MappingProxyType(
+
+# in-process coreutils, builtins only when SHELL_NATIVE_UTILS is set
+NATIVE_HANDLERS: Mapping[str, BuiltinHandler] = MappingProxyType(
+    {
+        CommandType.CAT: do_cat,
+        CommandType.HEAD: do_head,
+        CommandType.PRINTF: do_printf,
+        CommandType.TRUE: do_true,
+        CommandType.WC: do_wc,
+    }
+)
+NATIVE_SUPPORT: Mapping[str, Support] = MappingProxyType(
+    {
+        CommandType.CAT: supports_cat,
+        CommandType.HEAD: supports_head,
+        CommandType.PRINTF: supports_printf,
+        CommandType.WC: supports_wc,
+    }
+)
+DEFAULT_HANDLERS: Mapping[str, BuiltinHandler] = MappingProxyType(
     {
+        CommandType.BG: DeferredHandler(JOB_BUILTINS, "do_bg"),
         CommandType.CD: do_cd,
         CommandType.ECHO: do_echo,
         CommandType.EXIT: do_exit,
-        CommandType.HISTORY: do_history,
+        CommandType.FG: DeferredHandler(JOB_BUILTINS, "do_fg"),
+        CommandType.HASH: do_hash,
+        CommandType.HISTORY: DeferredHandler("app.history_builtin", "do_history"),
+        CommandType.JOBS: DeferredHandler(JOB_BUILTINS, "do_jobs"),
+        CommandType.PARALLEL: DeferredHandler("app.parallel_builtin", "do_parallel"),
         CommandType.TYPE: do_type,
         CommandType.PWD: do_pwd,
+        CommandType.WAIT: DeferredHandler(JOB_BUILTINS, "do_wait"),
+        **(NATIVE_HANDLERS if NATIVE_UTILS else {}),
     }
 )
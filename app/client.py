@@ -0,0 +1,91 @@
+"""Thin client for app.server: runs a shell invocation in a warm server process.
+
+    python -m app.client [-c COMMAND | SCRIPT]
+
+The arguments, cwd and environment are sent over the server socket along
+with the client's stdin, stdout and stderr, which the server session uses
+directly, and the client exits with the status it gets back. Without a
+server, and for interactive use, it runs app.main in-process instead.
+Only the standard library modules needed for that are imported here.
+"""
+
+import os
+import socket
+import struct
+import sys
+
+SOCKET_PATH = os.environ.get("SHELL_SERVER_SOCKET") or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or "/tmp", f"shell-server-{os.getuid()}.sock"
+)
+# a request is length-prefixed: the argument count, the arguments, cwd and environment, NUL-separated
+LENGTH = struct.Struct("!I")
+STATUS = struct.Struct("!i")
+STDIO_FDS = (0, 1, 2)
+INTERRUPT = b"\x03"
+SEPARATOR = b"\0"
+
+
+def encode_request(args: list[str]) -> bytes:
+    fields = [str(len(args)).encode()]
+    fields.extend(map(os.fsencode, args))
+    fields.append(os.getcwdb())
+    fields.extend(map(b"=".join, os.environb.items()))
+    request = SEPARATOR.join(fields)
+    return LENGTH.pack(len(request)) + request
+
+
+def receive_status(client: socket.socket) -> int:
+    reply = b""
+    while len(reply) < STATUS.size:
+        try:
+            chunk = client.recv(STATUS.size - len(reply))
+        except KeyboardInterrupt:
+            # the session runs in its own process group, so ^C is passed on
+            client.sendall(INTERRUPT)
+            continue
+        if not chunk:
+            raise ConnectionError("server closed the session")
+        reply += chunk
+    return STATUS.unpack(reply)[0]
+
+
+def connect() -> socket.socket | None:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(SOCKET_PATH)
+    except OSError:
+        client.close()
+        return None
+    return client
+
+
+def run_remote(client: socket.socket, request: bytes) -> int:
+    sent = socket.send_fds(client, [request], list(STDIO_FDS))
+    if sent < len(request):
+        client.sendall(request[sent:])
+    return receive_status(client)
+
+
+def run_local() -> None:
+    from app.main import main as run_main  # noqa: WPS433
+
+    run_main()
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    client = None if not args and sys.stdin.isatty() else connect()
+    if client is None:
+        run_local()
+        return
+    with client:
+        try:
+            status = run_remote(client, encode_request(args))
+        except OSError as error:
+            sys.stderr.write(f"bash: server session failed: {error}\n")
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,162 +1,249 @@
 import os
 import shlex
-from typing import Iterator, Optional
-
-from app.exceptions import EmptyCommandError
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from app.exceptions import CommandSyntaxError, EmptyCommandError
+from app.lexer import CommandParser, Token, TokenType
+from app.tracing import parse_counter
+
+NEWLINE_TOKEN = "newline"
+TIME_KEYWORD = "time"
+STDOUT_FD = 1
+STDERR_FD = 2
+PARSE_CACHE_SIZE = int(os.environ.get("SHELL_PARSE_CACHE_SIZE") or 1024)
+REDIRECT_OPERATORS = MappingProxyType(
+    {
+        ">": (STDOUT_FD, False),
+        "1>": (STDOUT_FD, False),
+        ">>": (STDOUT_FD, True),
+        "1>>": (STDOUT_FD, True),
+        "2>": (STDERR_FD, False),
+        "2>>": (STDERR_FD, True),
+    }
+)
+CHAIN_OPERATORS = frozenset((TokenType.AND, TokenType.OR))
+LIST_SEPARATORS = frozenset((TokenType.SEMICOLON, TokenType.BACKGROUND))
+
+Patterns = tuple[tuple[int, str], ...]
+
+
+class Redirect(NamedTuple):
+    fd: int
+    filename: str
+    is_append: bool
+
+
+class CommandOne:
+    """One simple command: its words and at most one redirect per fd, never changed after parsing.
+
+    `patterns` holds the index and glob pattern of every word with an
+    unquoted wildcard, and `substitutions` the index and token of every word
+    with a command substitution, both expanded each time the command runs.
+    """
+
+    __slots__ = ("tokens", "args", "redirects", "text", "patterns", "substitutions")
+
+    def __init__(self, incoming_tokens: list[Token]) -> None:
+        redirects: dict[int, Redirect] = {}
+        words = tuple(self._words(incoming_tokens, redirects))
+        if not words:
+            raise EmptyCommandError
+        self.tokens = tuple(word.text for word in words)
+        self.args = self.tokens[1:]
+        self.redirects = tuple(sorted(redirects.values()))
+        self.text = " ".join(shlex.quote(arg) for arg in self.tokens)
+        self.patterns = tuple(
+            (index, word.pattern)
+            for index, word in enumerate(words)
+            if word.pattern is not None
+        )
+        self.substitutions = tuple(
+            (index, word)
+            for index, word in enumerate(words)
+            if word.parts is not None
+        )
+
+    def with_words(self, words: tuple[str, ...], patterns: Patterns = ()) -> "CommandOne":
+        command = object.__new__(CommandOne)
+        command.tokens = words
+        command.args = words[1:]
+        command.redirects = self.redirects
+        command.text = self.text
+        command.patterns = patterns
+        command.substitutions = ()
+        return command
+
+    @property
+    def cmd_type(self) -> str:
+        return self.tokens[0]
 
-SINGLE_QUOTE = "'"
-DOUBLE_QUOTE = '"'
-BACKSLASH = "\\"
-NEW_LINE = "\n"
-BACKTICK = "`"
-DOLLAR_SIGN = "$"
-HOME_DIR = "~"
-SPACE = " "
-PIPE = "|"
-HOME = os.getenv("HOME", "")
+    def __getitem__(self, index: int) -> str:
+        return self.tokens[index]
 
+    def __repr__(self) -> str:
+        return str(self.tokens)
 
-class CommandParser:
-    def __init__(self, line: str) -> None:
-        self.add_new_item = True
-        self.inside_single_quote = False
-        self.inside_double_quote = False
-        self.is_after_backslash = False
-        result: list[str] = []
-        for symbol in line:
-            if self.inside_single_quote:
-                use_symbol = self._process_inside_single_quote(symbol)
-            elif self.inside_double_quote:
-                use_symbol = self._process_inside_double_quote(symbol)
+    def _words(self, incoming_tokens: list[Token], redirects: dict[int, Redirect]) -> Iterator[Token]:
+        remaining = iter(incoming_tokens)
+        for token in remaining:
+            if token.kind == TokenType.WORD:
+                yield token
             else:
-                use_symbol = self._process_regular(symbol)
+                redirect = self._redirect(token, next(remaining, None))
+                redirects[redirect.fd] = redirect
 
-            if use_symbol is not None:
-                if self.add_new_item:
-                    result.append(use_symbol)
-                    self.add_new_item = False
-                else:
-                    result[-1] += use_symbol
-        self.tokens = result
+    def _redirect(self, operator: Token, target: Optional[Token]) -> Redirect:
+        if target is None:
+            raise CommandSyntaxError(NEWLINE_TOKEN)
+        if target.kind != TokenType.WORD:
+            raise CommandSyntaxError(target.text)
+        fd, is_append = REDIRECT_OPERATORS[operator.text]
+        return Redirect(fd, target.text, is_append)
 
-    def __len__(self) -> int:
-        return len(self.tokens)
 
-    def __iter__(self) -> Iterator[str]:
-        return iter(self.tokens)
+class CommandFull:
+    __slots__ = ("commands", "is_timed", "last_command", "text")
+
+    def __init__(self, tokens: list[Token]) -> None:
+        self.is_timed = (
+            len(tokens) > 1
+            and tokens[0].kind == TokenType.WORD
+            and tokens[0].text == TIME_KEYWORD
+            and tokens[1].kind == TokenType.WORD
+        )
+        if self.is_timed:
+            tokens = tokens[1:]
+        self.commands = tuple(self._split(tokens))
+        self.last_command = self.commands[-1]
+        self.text = " | ".join(command.text for command in self.commands)
+        if self.is_timed:
+            self.text = f"{TIME_KEYWORD} {self.text}"
 
-    def __getitem__(self, index: int) -> str:
-        return self.tokens[index]
+    def __repr__(self) -> str:
+        return str(self.commands)
 
-    def _process_inside_single_quote(self, symbol: str) -> Optional[str]:
-        if not self.inside_single_quote:
-            raise NotImplementedError
-        if symbol == SINGLE_QUOTE:
-            self.inside_single_quote = False
-            return None
-        return symbol
-
-    def _process_inside_double_quote(self, symbol: str) -> Optional[str]:
-        prepend = ""
-        if self.is_after_backslash:
-            self.is_after_backslash = False
-            if symbol in [DOUBLE_QUOTE, BACKSLASH, DOLLAR_SIGN, BACKTICK, NEW_LINE]:
-                return symbol
-            prepend = BACKSLASH
-        if symbol == DOUBLE_QUOTE:
-            self.inside_double_quote = False
-            return None
-        if symbol == BACKSLASH:
-            self.is_after_backslash = True
-            return None
-        if symbol == HOME_DIR:
-            return f"{prepend}{HOME}"
-        return f"{prepend}{symbol}"
-
-    def _process_regular(self, symbol: str) -> Optional[str]:  # noqa: WPS212
-        if self.is_after_backslash:
-            self.is_after_backslash = False
-            return symbol
-        if symbol == SINGLE_QUOTE:
-            self.inside_single_quote = True
-            return None
-        if symbol == DOUBLE_QUOTE:
-            self.inside_double_quote = True
-            return None
-        if symbol == BACKSLASH:
-            self.is_after_backslash = True
-            return None
-        if symbol == SPACE:
-            self.add_new_item = True
-            return None
-        if symbol == HOME_DIR:
-            return HOME
-        return symbol
-
-
-class CommandOne:  # noqa: WPS230
-    def __init__(self, incoming_tokens: list[str]) -> None:
-        self.incoming_tokens = incoming_tokens
-        if len(self.incoming_tokens) == 0:
-            raise EmptyCommandError
-        self.stdout_file: Optional[str] = None
-        self.stderr_file: Optional[str] = None
-        self.stdout_add: bool = False
-        self.stderr_add: bool = False
-        self.tokens: list[str] = []
-        self.skip_next = False
-        for i, token in enumerate(self.incoming_tokens):
-            self._process_incoming_token(i, token)
-        if len(self.tokens) == 0:
-            raise EmptyCommandError
-        self.cmd_type = self.tokens[0]
-        self.args = self.tokens[1:]
-        self.text = " ".join(shlex.quote(arg) for arg in self.tokens)
+    @classmethod
+    def from_line(cls, line: str) -> "CommandFull":
+        return cls(CommandParser(line).tokens)
 
-    def __getitem__(self, index: int) -> str:
-        return self.tokens[index]
+    def _split(self, tokens: list[Token]) -> Iterator[CommandOne]:
+        current_command: list[Token] = []
+        for token in tokens:
+            if token.kind == TokenType.PIPE:
+                yield CommandOne(current_command)
+                current_command = []
+            else:
+                current_command.append(token)
+        yield CommandOne(current_command)
+
+
+class CommandChain:
+    """Pipelines joined by `&&` and `||`, run one after another as a single job.
+
+    `operators[i]` decides, from the status of everything before it, whether
+    `pipelines[i + 1]` runs.
+    """
+
+    __slots__ = ("pipelines", "operators", "is_background", "text")
+
+    def __init__(self, tokens: list[Token], is_background: bool) -> None:
+        self.is_background = is_background
+        self.pipelines = tuple(self._split(tokens))
+        self.operators = tuple(token for token in tokens if token.kind in CHAIN_OPERATORS)
+        self.text = " ".join(self._texts())
 
     def __repr__(self) -> str:
-        return str(self.tokens)
+        return str(self.pipelines)
 
-    def _process_incoming_token(self, i: int, token: str) -> None:
-        if self.skip_next:
-            self.skip_next = False
-            return
-        if token in [">", "1>"]:
-            self.stdout_file = self.incoming_tokens[i + 1]
-            self.skip_next = True
-            return
-        if token in [">>", "1>>"]:
-            self.stdout_file = self.incoming_tokens[i + 1]
-            self.stdout_add = True
-            self.skip_next = True
-            return
-        if token == "2>":
-            self.stderr_file = self.incoming_tokens[i + 1]
-            self.skip_next = True
-            return
-        if token == "2>>":
-            self.stderr_file = self.incoming_tokens[i + 1]
-            self.stderr_add = True
-            self.skip_next = True
-            return
-        self.tokens.append(token)
+    def pipelines_to_run(self, last_status: Callable[[], int]) -> Iterator[CommandFull]:
+        """The pipelines that `&&` and `||` let run, for the builtin and the async runners alike.
 
+        Whether one runs depends on last_status, called once the pipeline before it has run.
+        """
+        yield self.pipelines[0]
+        for operator, pipeline in zip(self.operators, self.pipelines[1:]):
+            if (operator.kind == TokenType.AND) == (last_status() == 0):
+                yield pipeline
 
-class CommandFull:
-    def __init__(self, line: str) -> None:
-        self.commands: list[CommandOne] = []
-        tokens = CommandParser(line)
-        current_command: list[str] = []
+    def _split(self, tokens: list[Token]) -> Iterator[CommandFull]:
+        current_pipeline: list[Token] = []
         for token in tokens:
-            if token == PIPE:
-                self.commands.append(CommandOne(current_command))
-                current_command = []
+            if token.kind not in CHAIN_OPERATORS:
+                current_pipeline.append(token)
                 continue
-            current_command.append(token)
-        self.commands.append(CommandOne(current_command))
-        self.last_command = self.commands[-1]
+            if not current_pipeline:
+                raise CommandSyntaxError(token.text)
+            yield CommandFull(current_pipeline)
+            current_pipeline = []
+        if not current_pipeline:
+            raise CommandSyntaxError(NEWLINE_TOKEN)
+        yield CommandFull(current_pipeline)
+
+    def _texts(self) -> Iterator[str]:
+        yield self.pipelines[0].text
+        for operator, pipeline in zip(self.operators, self.pipelines[1:]):
+            yield f"{operator.text} {pipeline.text}"
+
+
+class CommandList:
+    """A command line: chains separated by `;`, or by `&` to run them in the background."""
+
+    __slots__ = ("chains",)
+
+    def __init__(self, line: str) -> None:
+        self.chains = tuple(self._split(CommandParser(line)))
+        if not self.chains:
+            raise EmptyCommandError
+
+    def __iter__(self) -> Iterator[CommandChain]:
+        return iter(self.chains)
 
     def __repr__(self) -> str:
-        return str(self.commands)
+        return str(self.chains)
+
+    def _split(self, tokens: Iterable[Token]) -> Iterator[CommandChain]:
+        current_chain: list[Token] = []
+        for token in tokens:
+            if token.kind not in LIST_SEPARATORS:
+                current_chain.append(token)
+                continue
+            if not current_chain:
+                raise CommandSyntaxError(token.text)
+            yield CommandChain(current_chain, token.kind == TokenType.BACKGROUND)
+            current_chain = []
+        if current_chain:
+            yield CommandChain(current_chain, is_background=False)
+
+
+class ParseCache:
+    """Parsed command lines by their raw text, the least recently used dropped first.
+
+    Only lines that parse are kept. Parsed commands are never changed, so one
+    entry serves every later run of the same line, from any thread.
+    """
+
+    def __init__(self, size: int = PARSE_CACHE_SIZE) -> None:
+        self.size = size
+        self.entries: OrderedDict[str, CommandList] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def parse(self, line: str) -> CommandList:
+        with self.lock:
+            command_list = self.entries.get(line)
+            if command_list is not None:
+                self.entries.move_to_end(line)
+        parse_counter.lookup(is_hit=command_list is not None)
+        if command_list is not None:
+            return command_list
+        command_list = CommandList(line)
+        with self.lock:
+            self.entries[line] = command_list
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return command_list
+
+
+parse_cache = ParseCache()
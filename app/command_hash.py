@@ -0,0 +1,92 @@
+import os
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from app.subshell import current_directory
+
+
+def dir_mtime(path_dir: Union[str, Path]) -> Optional[int]:
+    try:
+        return os.stat(path_dir).st_mtime_ns
+    except OSError:
+        return None
+
+
+class HashEntry:
+    def __init__(self, file_path: Path, mtime: Optional[int]) -> None:
+        self.file_path = file_path
+        self.mtime = mtime
+        self.hits = 0
+
+    def is_valid(self) -> bool:
+        if self.mtime is None:
+            return True
+        return dir_mtime(self.file_path.parent) == self.mtime
+
+
+class CommandHash:  # noqa: WPS214
+    """Remembers where PATH lookups found each command, like the bash hash table.
+
+    An entry is dropped when PATH changes or when the directory it was found in
+    is modified. Entries added with `hash -p` are kept until removed explicitly.
+    """
+
+    def __init__(self) -> None:
+        self.path = os.environ.get("PATH", "")
+        self.entries: dict[str, HashEntry] = {}
+
+    def __len__(self) -> int:
+        self._check_path()
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[tuple[str, HashEntry]]:
+        self._check_path()
+        return iter(list(self.entries.items()))
+
+    def find(self, file_name: str, count_hit: bool = False) -> Optional[Path]:
+        if os.sep in file_name:
+            # a name with a slash is a path, relative to the cwd, and is never looked up in PATH
+            named_path = Path(current_directory(), file_name)
+            return named_path if os.access(named_path, os.X_OK) else None
+        self._check_path()
+        entry = self.entries.get(file_name)
+        if entry is not None and not entry.is_valid():
+            self.entries.pop(file_name)
+            entry = None
+        if entry is None:
+            file_path = _search_path(self.path, file_name)
+            if file_path is None:
+                return None
+            entry = HashEntry(file_path, dir_mtime(file_path.parent))
+            self.entries[file_name] = entry
+        if count_hit:
+            entry.hits += 1
+        return entry.file_path
+
+    def add(self, file_name: str, file_path: Path) -> None:
+        self._check_path()
+        self.entries[file_name] = HashEntry(file_path, None)
+
+    def remove(self, file_name: str) -> bool:
+        self._check_path()
+        return self.entries.pop(file_name, None) is not None
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def _check_path(self) -> None:
+        path = os.environ.get("PATH", "")
+        if path != self.path:
+            self.path = path
+            self.entries.clear()
+
+
+def _search_path(path: str, file_name: str) -> Optional[Path]:
+    for path_dir in path.split(os.pathsep):
+        file_path = Path(path_dir) / file_name
+        if os.access(file_path, os.X_OK):
+            return file_path
+    return None
+
+
+command_hash = CommandHash()
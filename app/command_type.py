@@ -2,9 +2,20 @@ from enum import StrEnum
 
 
 class CommandType(StrEnum):
+    BG = "bg"
+    CAT = "cat"
     CD = "cd"
     ECHO = "echo"
     EXIT = "exit"
+    FG = "fg"
+    HASH = "hash"
+    HEAD = "head"
     HISTORY = "history"
+    JOBS = "jobs"
+    PARALLEL = "parallel"
+    PRINTF = "printf"
     PWD = "pwd"
+    TRUE = "true"
     TYPE = "type"
+    WAIT = "wait"
+    WC = "wc"
@@ -0,0 +1,18 @@
+from app.builtin import DEFAULT_HANDLERS
+from app.completion_index import completion_index
+
+
+def completer(text: str, state: int) -> str | None:
+    shell_builtin = [f"{opt} " for opt in DEFAULT_HANDLERS.keys() if opt.startswith(text)]
+    if state < len(shell_builtin):
+        return shell_builtin[state]
+
+    index = len(shell_builtin)
+    matches = completion_index.complete(text, state, exclude=DEFAULT_HANDLERS)
+    if state - index < len(matches):
+        result = matches[state - index]
+        if len(matches) == 1:
+            return f"{result} "
+        else:
+            return result
+    return None
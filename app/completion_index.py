@@ -0,0 +1,71 @@
+import os
+from bisect import bisect_left
+from itertools import chain, islice, takewhile
+from operator import methodcaller
+from typing import Container, Optional
+
+from app.command_hash import dir_mtime
+
+DirListing = tuple[Optional[int], list[str]]
+
+
+def _list_executables(path_dir: str, mtime: Optional[int]) -> DirListing:
+    names: list[str] = []
+    if mtime is None:
+        return mtime, names
+    try:
+        with os.scandir(path_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and os.access(entry.path, os.X_OK):
+                    names.append(entry.name)
+    except OSError:
+        return mtime, []
+    return mtime, names
+
+
+class CompletionIndex:
+    """Sorted index of the executables found in PATH.
+
+    Directories are listed lazily and only listed again when their mtime
+    changes. The matches of the last query are kept so that readline can
+    walk through them state by state without touching the filesystem.
+    """
+
+    def __init__(self) -> None:
+        self.path: Optional[str] = None
+        self.listings: dict[str, DirListing] = {}
+        self.names: list[str] = []
+        self.text: Optional[str] = None
+        self.matches: list[str] = []
+
+    def complete(self, text: str, state: int, exclude: Container[str] = ()) -> list[str]:
+        if state == 0 or text != self.text:
+            self.refresh()
+            self.text = text
+            self.matches = [name for name in self._query(text) if name not in exclude]
+        return self.matches
+
+    def refresh(self) -> None:
+        path = os.environ.get("PATH", "")
+        path_dirs = dict.fromkeys(path.split(os.pathsep))
+        listings = {path_dir: self._listing(path_dir) for path_dir in path_dirs}
+        if path != self.path or listings != self.listings:
+            self.path = path
+            self.listings = listings
+            names = chain.from_iterable(listing_names for _, listing_names in listings.values())
+            self.names = sorted(set(names))
+
+    def _listing(self, path_dir: str) -> DirListing:
+        mtime = dir_mtime(path_dir)
+        listing = self.listings.get(path_dir)
+        if listing is None or listing[0] != mtime:
+            return _list_executables(path_dir, mtime)
+        return listing
+
+    def _query(self, text: str) -> list[str]:
+        index = bisect_left(self.names, text)
+        candidates = islice(self.names, index, None)
+        return list(takewhile(methodcaller("startswith", text), candidates))
+
+
+completion_index = CompletionIndex()
@@ -0,0 +1,50 @@
+"""In-process versions of small coreutils, used instead of a fork when SHELL_NATIVE_UTILS is set.
+
+Each one handles only the common forms of its command. For anything else
+its support check is false and the external binary runs as before. cat and
+true live here with the helpers they share with head, wc and printf.
+"""
+
+import os
+from typing import AsyncIterator, Callable
+
+from app.command import CommandOne
+from app.subshell import resolve
+from app.types import BuiltinOutput, StdinIterator
+
+NATIVE_UTILS = os.environ.get("SHELL_NATIVE_UTILS", "") not in {"", "0"}
+READ_SIZE = 1 << 16
+STDIN_NAME = "-"
+
+Support = Callable[[tuple[str, ...]], bool]
+
+
+def is_option(arg: str) -> bool:
+    return arg.startswith("-") and arg != STDIN_NAME
+
+
+async def read_chunks(filename: str, stdin: StdinIterator) -> AsyncIterator[bytes]:
+    if filename == STDIN_NAME:
+        async for stdin_chunk in stdin:
+            yield stdin_chunk
+        return
+    with open(resolve(filename), "rb", buffering=0) as file:
+        while chunk := file.read(READ_SIZE):
+            yield chunk
+
+
+def supports_cat(args: tuple[str, ...]) -> bool:
+    return not any(is_option(arg) for arg in args)
+
+
+async def do_cat(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    for filename in command.args or (STDIN_NAME,):
+        try:
+            async for chunk in read_chunks(filename, stdin):
+                yield chunk, None
+        except OSError as error:
+            yield None, f"cat: {filename}: {error.strerror}\n"
+
+
+async def do_true(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    yield None, None
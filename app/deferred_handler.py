@@ -0,0 +1,24 @@
+from importlib import import_module
+from typing import Callable
+
+from app.command import CommandOne
+from app.types import BuiltinOutput, StdinIterator
+
+
+class DeferredHandler:
+    """A builtin whose module is imported on its first call.
+
+    The job and parallel builtins need asyncio and the job table, and history
+    needs readline and the history file, which a script of plain builtins
+    never has to load.
+    """
+
+    def __init__(self, module: str, name: str) -> None:
+        self.module = module
+        self.name = name
+
+    def __call__(self, command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+        handler: Callable[[CommandOne, StdinIterator], BuiltinOutput] = getattr(
+            import_module(self.module), self.name
+        )
+        return handler(command, stdin)
@@ -0,0 +1,92 @@
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from fnmatch import translate
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable, Iterator, Optional
+
+DIRECTORY_CACHE_SIZE = 256
+PATTERN_CACHE_SIZE = 256
+# a listing taken within this long of the directory's last change may miss a change in the same mtime tick
+RACY_NS = 10_000_000
+HIDDEN_PREFIX = "."
+NOT_HIDDEN = r"(?!\.)"
+GLOB_CHAR = re.compile(r"[*?\[]")
+
+Matcher = Callable[[str], Optional[re.Match[str]]]
+Listing = tuple[int, tuple[str, ...]]
+
+
+def literal_prefix(component: str) -> str:
+    return GLOB_CHAR.split(component, maxsplit=1)[0]
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_component(component: str) -> Matcher:
+    """Matcher for one path component; a name starting with `.` matches only a pattern that does too."""
+    pattern = translate(component)
+    if not component.startswith(HIDDEN_PREFIX):
+        pattern = f"{NOT_HIDDEN}{pattern}"
+    return re.compile(pattern).match
+
+
+class DirectoryCache:
+    """Sorted names of directories, each listing reused until the directory's mtime changes.
+
+    A directory of 200k files costs one stat per lookup instead of a scandir.
+    Entries are keyed by absolute path, so changing directory does not mix
+    them up, and the least recently used ones are dropped first.
+    """
+
+    def __init__(self, size: int = DIRECTORY_CACHE_SIZE) -> None:
+        self.size = size
+        self.entries: OrderedDict[str, Listing] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def names(self, directory: str) -> tuple[str, ...]:
+        path = os.path.abspath(directory)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return ()
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == mtime_ns:
+                self.entries.move_to_end(path)
+                return entry[1]
+        return self._scan(path, mtime_ns)
+
+    def matching(self, directory: str, component: str) -> Iterator[str]:
+        """Names in directory matching the glob component, in sorted order."""
+        names = self.names(directory)
+        prefix = literal_prefix(component)
+        # names are sorted, so the ones starting with the literal part of the pattern are adjacent
+        start = bisect_left(names, prefix)
+        head = itemgetter(slice(len(prefix)))
+        end = bisect_right(names, prefix, lo=start, key=head)
+        return filter(compile_component(component), names[start:end])
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def _scan(self, path: str, mtime_ns: int) -> tuple[str, ...]:
+        scanned_at = time.time_ns()
+        try:
+            with os.scandir(path) as entries:
+                names = tuple(sorted(entry.name for entry in entries))
+        except OSError:
+            return ()
+        if scanned_at - mtime_ns > RACY_NS:
+            with self.lock:
+                self.entries[path] = (mtime_ns, names)
+                if len(self.entries) > self.size:
+                    self.entries.popitem(last=False)
+        return names
+
+
+directory_cache = DirectoryCache()
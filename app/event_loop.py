@@ -0,0 +1,63 @@
+import asyncio
+import os
+import select
+import signal
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional, TypeVar
+
+from app.exceptions import JobStoppedError
+from app.output import output
+
+ResultType = TypeVar("ResultType")
+PIPE_BUF = 4096
+
+
+class EventLoopThread:
+    """One asyncio event loop for the whole session, running in a daemon thread.
+
+    input() stays on the main thread, where readline works, and every command
+    line is handed over to the loop instead of starting a new one.
+    """
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="event-loop", daemon=True)
+        self.thread.start()
+        output.attach(self)
+        self.wakeup_fds: Optional[tuple[int, int]] = None
+
+    def wake_on_signals(self) -> None:
+        """Lets the handlers of signals delivered to other threads, like SIGCHLD, run while run() waits."""
+        self.wakeup_fds = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+        signal.set_wakeup_fd(self.wakeup_fds[1], warn_on_full_buffer=False)
+
+    def run(self, coroutine: Coroutine[Any, Any, ResultType]) -> ResultType:
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return self._wait(future)
+        except (KeyboardInterrupt, JobStoppedError):
+            future.cancel()
+            raise
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        output.detach()
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+
+    def _wait(self, future: "Future[ResultType]") -> ResultType:
+        if self.wakeup_fds is None:
+            return future.result()
+        read_fd, write_fd = self.wakeup_fds
+        # a handler only runs on the main thread, once it is back from select
+        future.add_done_callback(lambda _: os.write(write_fd, b"\0"))
+        while not future.done():
+            select.select([read_fd], [], [])
+            while True:  # noqa: WPS457
+                try:
+                    os.read(read_fd, PIPE_BUF)
+                except BlockingIOError:
+                    break
+        return future.result()
@@ -1,10 +1,38 @@
+from pathlib import Path
+from typing import Optional
+
+
 class ExitError(Exception):
     """ExitError"""
 
+    def __init__(self, status: Optional[int] = None) -> None:
+        super().__init__(status)
+        self.status = status
+
 
 class NotBuildinError(Exception):
     """NotBuildinError"""
 
+    def __init__(self, file_path: Path) -> None:
+        super().__init__(file_path)
+        self.file_path = file_path
+
 
 class EmptyCommandError(Exception):
     """NotBuildinError"""
+
+
+class RedirectionError(Exception):
+    """RedirectionError"""
+
+
+class CommandSyntaxError(Exception):
+    """CommandSyntaxError"""
+
+
+class CommandNotFoundError(Exception):
+    """CommandNotFoundError"""
+
+
+class JobStoppedError(Exception):
+    """JobStoppedError"""
@@ -0,0 +1,130 @@
+import os
+import signal
+import sys
+from contextlib import nullcontext, suppress
+from functools import partial
+from types import FrameType
+from typing import Iterator, Optional
+
+from app.async_command_processor import process_chain
+from app.command import CommandChain
+from app.event_loop import EventLoopThread
+from app.exceptions import JobStoppedError
+from app.jobs import Job, jobs, terminal
+from app.service_functions import write_all, writeln
+from app.status import SIGNAL_STATUS_BASE
+from app.subshell import Subshell
+
+
+async def wrapper(chain: CommandChain, job: Job) -> None:
+    # a chain run with & is a subshell, so what its builtins change does not reach the shell
+    with Subshell(job) if chain.is_background else nullcontext():
+        async for stdout, stderr in process_chain(chain, job):
+            write_all(stdout=stdout, stderr=stderr)
+
+
+TERMINAL_STOP_SIGNALS = frozenset((signal.SIGTTIN, signal.SIGTTOU))
+STOPPED_WAIT_OPTIONS = os.WSTOPPED | os.WNOHANG | os.WNOWAIT
+
+
+def stop_foreground(signum: int, frame: Optional[FrameType]) -> None:
+    job = jobs.foreground
+    if job is not None and job.pgid is not None and not job.is_done():
+        raise JobStoppedError
+
+
+def watch_foreground(signum: int, frame: Optional[FrameType]) -> None:
+    """Notices Ctrl-Z stopping the foreground job, which gets it instead of the shell while it has the terminal."""
+    job = jobs.foreground
+    if job is None or job.pgid is None or job.is_done():
+        return
+    try:
+        stopped = os.waitid(os.P_PGID, job.pgid, STOPPED_WAIT_OPTIONS)
+    except ChildProcessError:
+        return
+    if stopped is None:
+        return
+    if stopped.si_status in TERMINAL_STOP_SIGNALS:
+        # it used the terminal before getting it, or after the shell took it back
+        terminal.hand_over(job)
+        return
+    raise JobStoppedError
+
+
+class Executor:
+    """Runs command chains as jobs on a background event loop.
+
+    main creates it for the first chain that is not builtin-only, so asyncio
+    and the command processor are only imported once a process has to run.
+    """
+
+    def __init__(self, job_control: bool = False) -> None:
+        self.event_loop = EventLoopThread()
+        jobs.job_control = job_control
+        if job_control:
+            signal.signal(signal.SIGTSTP, stop_foreground)
+            signal.signal(signal.SIGCHLD, watch_foreground)
+            self.event_loop.wake_on_signals()
+            terminal.open(sys.stdin.fileno())
+
+    def run(self, chain: CommandChain) -> Optional[int]:
+        """Status of chain, or None when Ctrl-C cut it short."""
+        runner = partial(wrapper, chain)
+        job = self.event_loop.run(jobs.start(runner, chain.text, chain.is_background))
+        if not chain.is_background:
+            return self.run_foreground(job)
+        if jobs.job_control:
+            _announce(job)
+        return 0
+
+    def run_foreground(self, job: Job) -> Optional[int]:
+        is_interrupted = False
+        status = 0
+        jobs.foreground = job
+        while jobs.foreground is not None:
+            current = jobs.foreground
+            if not self._wait_foreground(current):
+                writeln(b"\n", is_stdout=False)
+                is_interrupted = True
+            if jobs.foreground is current:
+                jobs.foreground = None
+            if current.is_stopped:
+                status = SIGNAL_STATUS_BASE + signal.SIGTSTP
+            else:
+                status = current.status
+                jobs.remove(current)
+        return None if is_interrupted else status
+
+    def notices(self) -> Iterator[str]:
+        return jobs.reap()
+
+    def close(self) -> None:
+        with suppress(KeyboardInterrupt):
+            self.event_loop.run(jobs.close(wait=not jobs.job_control))
+        self.event_loop.close()
+
+    def _wait_foreground(self, job: Job) -> bool:
+        """Waits until job is done or stopped, with the terminal lent to it; False when Ctrl-C interrupted it."""
+        terminal.lend(job)
+        try:
+            self.event_loop.run(job.wait())
+        except KeyboardInterrupt:
+            job.signal(signal.SIGINT)
+            self.event_loop.run(job.cancel())
+            if not jobs.job_control:
+                raise
+            job.is_interrupted = True
+        except JobStoppedError:
+            job.stop()
+            jobs.add(job)
+            writeln(f"\n{jobs.describe(job)}".encode(), is_stdout=False)
+        terminal.take_back()
+        return not job.is_interrupted
+
+
+def _announce(job: Job) -> None:
+    notice = f"[{job.number}]\n"
+    if job.pids:
+        last_pid = job.pids[-1]
+        notice = f"[{job.number}] {last_pid}\n"
+    writeln(notice.encode(), is_stdout=False)
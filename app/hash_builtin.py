@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from app.command import CommandOne
+from app.command_hash import command_hash
+from app.service_functions import join_or_none
+from app.subshell import is_subshell
+from app.types import BuiltinOutput, CommandResult, StdinIterator
+
+
+def _hash_table() -> CommandResult:
+    if len(command_hash) == 0:
+        return "hash: hash table empty\n", None
+    lines = ["hits\tcommand"]
+    for _, entry in command_hash:
+        lines.append("{0:4}\t{1}".format(entry.hits, entry.file_path))
+    return join_or_none(lines), None
+
+
+def _forget(name: str) -> bool:
+    """Whether name was hashed; in a subshell the shell's table is only looked at, as its own would be a copy."""
+    if is_subshell():
+        return any(hashed == name for hashed, _ in command_hash)
+    return command_hash.remove(name)
+
+
+def _hash_result(command: CommandOne) -> CommandResult:
+    if len(command.args) == 0:
+        return _hash_table()
+    option = command.args[0]
+    if option == "-r":
+        if not is_subshell():
+            command_hash.clear()
+        return None, None
+    if option == "-p":
+        if len(command.args) < 3:
+            return None, "hash: usage: hash [-r] [-p pathname] [-d] [name ...]\n"
+        if not is_subshell():
+            command_hash.add(command.args[2], Path(command.args[1]))
+        return None, None
+    if option == "-d":
+        names = command.args[1:]
+        not_found = [name for name in names if not _forget(name)]
+    else:
+        names = command.args
+        not_found = [name for name in names if command_hash.find(name) is None]
+    return None, join_or_none([f"hash: {name}: not found" for name in not_found])
+
+
+async def do_hash(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    yield _hash_result(command)
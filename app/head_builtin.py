@@ -0,0 +1,51 @@
+from typing import Optional
+
+from app.command import CommandOne
+from app.coreutils import STDIN_NAME, is_option, read_chunks
+from app.types import BuiltinOutput, StdinIterator
+
+DEFAULT_HEAD_LINES = 10
+NEW_LINE = b"\n"
+
+
+def _head_arguments(args: tuple[str, ...]) -> Optional[tuple[int, str]]:
+    count = str(DEFAULT_HEAD_LINES)
+    remaining = list(args)
+    if remaining and remaining[0] == "-n" and len(remaining) > 1:
+        count = remaining[1]
+        remaining = remaining[2:]
+    elif remaining and is_option(remaining[0]):
+        count = remaining.pop(0).removeprefix("-n").removeprefix("-")
+    if not count.isdigit() or len(remaining) > 1:
+        return None
+    if any(is_option(arg) for arg in remaining):
+        return None
+    return int(count), remaining[0] if remaining else STDIN_NAME
+
+
+def supports_head(args: tuple[str, ...]) -> bool:
+    return _head_arguments(args) is not None
+
+
+def _first_lines(chunk: bytes, count: int) -> bytes:
+    end = -1
+    for _ in range(count):
+        end = chunk.index(NEW_LINE, end + 1)
+    return chunk[: end + 1]
+
+
+async def do_head(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    arguments = _head_arguments(command.args)
+    if arguments is None or arguments[0] == 0:
+        return
+    remaining, filename = arguments
+    try:
+        async for chunk in read_chunks(filename, stdin):
+            lines = chunk.count(NEW_LINE)
+            if lines >= remaining:
+                yield _first_lines(chunk, remaining), None
+                return
+            remaining -= lines
+            yield chunk, None
+    except OSError as error:
+        yield None, f"head: cannot open '{filename}' for reading: {error.strerror}\n"
@@ -1,30 +1,118 @@
+import os
 import readline
-from contextlib import suppress
+import threading
+from typing import Iterator, Optional
 
+from app.history_file import append_entries, compact_history, history_lock
+from app.history_store import HistoryStore
 from app.types import CommandResult
 
+HISTORY_PRELOAD = 1000
+HISTORY_COMMIT_BATCH = 32
+HISTFILESIZE = int(os.environ.get("HISTFILESIZE") or 100000)
+COMPACT_SLACK = 1.25
+
 
 class AppendHistory:
+    """Appends the session's new entries to a history file.
+
+    Entries are written in one locked append, skipping consecutive duplicates,
+    so several shells can share one file.
+    """
+
     def __init__(self) -> None:
         self.processed = 0
 
     def __call__(self, filename: str) -> CommandResult:
         current_length = readline.get_current_history_length()
-        readline.append_history_file(current_length - self.processed, filename)
-        self.processed = readline.get_current_history_length()
+        numbers = range(self.processed + 1, current_length + 1)
+        entries = [readline.get_history_item(index) or "" for index in numbers]
+        self.processed = current_length
+        if entries:
+            append_entries(filename, entries)
         return None, None
 
+    def commit_if_needed(self, filename: str) -> None:
+        if readline.get_current_history_length() - self.processed >= HISTORY_COMMIT_BATCH:
+            self(filename)
+
 
 append_history = AppendHistory()
 
 
+def _matches(entry: str, pattern: str, is_prefix: bool) -> bool:
+    if is_prefix:
+        return entry.startswith(pattern)
+    return pattern in entry
+
+
+def preload_tail(store: HistoryStore) -> int:
+    length = len(store)
+    count = min(length, HISTORY_PRELOAD)
+    for index in range(length - count, length):
+        readline.add_history(store[index])
+    return count
+
+
+class History:
+    """The entries of HISTFILE followed by the ones readline collected in this session.
+
+    HISTFILE is served from a HistoryStore, and only its last HISTORY_PRELOAD
+    entries are copied into readline for line editing.
+    """
+
+    def __init__(self) -> None:
+        self.store: Optional[HistoryStore] = None
+        self.preloaded = 0
+
+    def __len__(self) -> int:
+        return self._stored() + readline.get_current_history_length() - self.preloaded
+
+    def __getitem__(self, number: int) -> str:
+        stored = self._stored()
+        if number <= stored and self.store is not None:
+            return self.store[number - 1]
+        return readline.get_history_item(number - stored + self.preloaded) or ""
+
+    def open(self, filename: str) -> None:
+        self.store = HistoryStore(filename)
+        self.preloaded = preload_tail(self.store)
+        append_history.processed = readline.get_current_history_length()
+        if len(self.store) > HISTFILESIZE * COMPACT_SLACK:
+            threading.Thread(target=compact_history, args=(filename, HISTFILESIZE), daemon=True).start()
+
+    def entries(self, start: int, end: int) -> Iterator[tuple[int, str]]:
+        for number in range(start, end):
+            yield number, self[number]
+
+    def search(self, pattern: str, end: int) -> Iterator[tuple[int, str]]:
+        is_prefix = pattern.startswith("^")
+        needle = pattern.removeprefix("^")
+        if self.store is not None:
+            for index in self.store.search(needle, is_prefix):
+                yield index + 1, self.store[index]
+        for number, entry in self.entries(self._stored() + 1, end):
+            if _matches(entry, needle, is_prefix):
+                yield number, entry
+
+    def _stored(self) -> int:
+        return 0 if self.store is None else len(self.store)
+
+
+history = History()
+
+
 def read_history(filename: str) -> CommandResult:
-    with suppress(OSError):
-        readline.read_history_file(filename)
+    preload_tail(HistoryStore(filename))
     append_history.processed = readline.get_current_history_length()
     return None, None
 
 
 def write_history(filename: str) -> CommandResult:
-    readline.write_history_file(filename)
+    temp_filename = f"{filename}.{os.getpid()}"
+    with history_lock(filename):
+        with open(temp_filename, "w") as file:
+            for _, entry in history.entries(1, len(history) + 1):
+                file.write(f"{entry}\n")
+        os.replace(temp_filename, filename)
     return None, None
@@ -0,0 +1,57 @@
+from itertools import chain, islice
+from types import MappingProxyType
+from typing import Callable, Iterator, Mapping
+
+from app.command import CommandOne
+from app.history import append_history, history, read_history, write_history
+from app.service_functions import join_or_none
+from app.subshell import is_subshell, resolve
+from app.types import BuiltinOutput, CommandResult, StdinIterator
+
+HISTORY_BATCH = 512
+READ_OPTION = "-r"
+FILE_OPTIONS: Mapping[str, Callable[[str], CommandResult]] = MappingProxyType(
+    {
+        READ_OPTION: read_history,
+        "-w": write_history,
+        "-a": append_history,
+    }
+)
+
+
+def _history_lines(entries: Iterator[tuple[int, str]]) -> Iterator[str]:
+    for number, entry in entries:
+        yield f"    {number}  {entry}"
+
+
+def _batches(lines: Iterator[str]) -> Iterator[CommandResult]:
+    while batch := list(islice(lines, HISTORY_BATCH)):
+        yield join_or_none(batch), None
+
+
+def _history_option(option: str, argument: str, length: int) -> Iterator[CommandResult]:
+    if option == "-s":
+        # entries are numbered from 1, so the last one, this command itself when interactive, is number length
+        yield from _batches(_history_lines(history.search(argument, length + 1)))
+        return
+    file_handler = FILE_OPTIONS.get(option)
+    if file_handler is None:
+        yield None, "NotImplementedError"
+    elif option != READ_OPTION or not is_subshell():
+        # the history of a subshell is a copy, so what it reads in would be dropped when it ends
+        yield file_handler(resolve(argument))
+
+
+async def do_history(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    length = len(history)
+    if len(command.args) == 2:
+        results = _history_option(command.args[0], command.args[1], length)
+    else:
+        if len(command.args) > 0:
+            start_index = max(0, length - int(command.args[0]))
+        else:
+            start_index = 0
+        lines = _history_lines(history.entries(start_index + 1, length))
+        results = _batches(chain(lines, [f"    {length}  {command.text}"]))
+    for result in results:
+        yield result
@@ -0,0 +1,76 @@
+import fcntl
+import os
+from contextlib import contextmanager, suppress
+from typing import BinaryIO, Iterator, Optional
+
+from app.history_store import INDEX_SUFFIX
+
+TAIL_BYTES = 4096
+
+
+def _open_locked(filename: str) -> BinaryIO:
+    """The history file, locked; opened again if another shell replaced it while this one waited."""
+    while True:
+        history_file = open(filename, "a+b")  # noqa: WPS515
+        fcntl.lockf(history_file, fcntl.LOCK_EX)
+        with suppress(OSError):
+            file_stat = os.fstat(history_file.fileno())
+            if os.path.samestat(file_stat, os.stat(filename)):
+                return history_file
+        history_file.close()
+
+
+@contextmanager
+def history_lock(filename: str) -> Iterator[BinaryIO]:
+    """Locks the history file itself and yields it.
+
+    A process loses its lockf locks on a file when it closes any descriptor of
+    that file, so everything done under the lock goes through the yielded one.
+    """
+    with _open_locked(filename) as history_file:
+        yield history_file
+
+
+def _last_entry(history_file: BinaryIO) -> Optional[str]:
+    size = history_file.seek(0, os.SEEK_END)
+    history_file.seek(max(0, size - TAIL_BYTES))
+    lines = history_file.read().splitlines()
+    return lines[-1].decode(errors="replace") if lines else None
+
+
+def _drop_consecutive_duplicates(entries: list[str], previous: Optional[str]) -> list[str]:
+    result: list[str] = []
+    for entry in entries:
+        if entry != previous:
+            result.append(entry)
+        previous = entry
+    return result
+
+
+def _write_tail(history_file: BinaryIO, temp_filename: str, keep: int) -> None:
+    history_file.seek(0)
+    entries = history_file.read().decode(errors="replace").splitlines()
+    entries = _drop_consecutive_duplicates(entries, None)[-keep:]
+    with open(temp_filename, "w", errors="surrogateescape") as temp_file:
+        temp_file.write("".join(f"{entry}\n" for entry in entries))
+    os.replace(temp_filename, history_file.name)
+
+
+def append_entries(filename: str, entries: list[str]) -> None:
+    with history_lock(filename) as history_file:
+        entries = _drop_consecutive_duplicates(entries, _last_entry(history_file))
+        text = "".join(f"{entry}\n" for entry in entries)
+        history_file.write(os.fsencode(text))
+
+
+def compact_history(filename: str, keep: int) -> None:
+    temp_filename = f"{filename}.{os.getpid()}"
+    with history_lock(filename) as history_file:
+        try:
+            _write_tail(history_file, temp_filename, keep)
+        except OSError:
+            with suppress(OSError):
+                os.unlink(temp_filename)
+            return
+        with suppress(OSError):
+            os.unlink(f"{filename}{INDEX_SUFFIX}")
@@ -0,0 +1,129 @@
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_right
+from contextlib import suppress
+from typing import Iterator
+
+INDEX_SUFFIX = ".idx"
+INDEX_HEADER = struct.Struct("<QI")
+CHECK_BYTES = 64
+NEW_LINE = b"\n"
+
+
+class HistoryStore:  # noqa: WPS214
+    """Read-only view of an append-only history file, one entry per line.
+
+    The file is memory-mapped and the start offset of every entry is kept in a
+    sidecar index next to it, so opening the file only scans the entries
+    appended since the index was last written, and reading an entry never
+    touches the ones before it.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.offsets = array("Q")
+        self.size = 0
+        self.data: mmap.mmap | bytes = b""
+        try:
+            with open(filename, "rb") as file:
+                self.size = os.fstat(file.fileno()).st_size
+                if self.size:
+                    self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            return
+        covered = self._load_index()
+        if covered < self.size:
+            self._scan(covered)
+            self._save_index()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> str:
+        start = self.offsets[index]
+        if index + 1 < len(self.offsets):
+            end = self.offsets[index + 1] - 1
+        elif self.data[-1:] == NEW_LINE:
+            end = self.size - 1
+        else:
+            end = self.size
+        return self.data[start:end].decode(errors="replace")
+
+    def search(self, pattern: str, is_prefix: bool = False) -> Iterator[int]:
+        needle = pattern.encode()
+        if is_prefix:
+            head = self.data[: len(needle)]
+            if head == needle and self.offsets:
+                yield 0
+            needle = NEW_LINE + needle
+        found = self.data.find(needle)
+        while found >= 0:
+            index = bisect_right(self.offsets, found + int(is_prefix)) - 1
+            yield index
+            position = self._next_start(index) - int(is_prefix)
+            found = self.data.find(needle, position)
+
+    def _index_filename(self) -> str:
+        return f"{self.filename}{INDEX_SUFFIX}"
+
+    def _next_start(self, index: int) -> int:
+        next_index = index + 1
+        return self.offsets[next_index] if next_index < len(self.offsets) else self.size
+
+    def _checksum(self, covered: int) -> int:
+        start = max(0, covered - CHECK_BYTES)
+        return zlib.crc32(self.data[start:covered])
+
+    def _load_index(self) -> int:
+        try:
+            with open(self._index_filename(), "rb") as file:
+                raw = file.read()
+        except OSError:
+            return 0
+        if len(raw) < INDEX_HEADER.size:
+            return 0
+        covered, checksum = INDEX_HEADER.unpack_from(raw)
+        offsets = raw[INDEX_HEADER.size :]
+        if not self._index_matches(covered, checksum, offsets):
+            return 0
+        self.offsets.frombytes(offsets)
+        return covered
+
+    def _index_matches(self, covered: int, checksum: int, offsets: bytes) -> bool:
+        if covered > self.size or len(offsets) % self.offsets.itemsize:
+            return False
+        if (covered > 0) != (len(offsets) > 0):
+            return False
+        last_byte = self.data[covered - 1 : covered]
+        return last_byte in {b"", NEW_LINE} and self._checksum(covered) == checksum
+
+    def _scan(self, position: int) -> None:
+        find = self.data.find
+        while position < self.size:
+            self.offsets.append(position)
+            end = find(NEW_LINE, position)
+            if end < 0:
+                return
+            position = end + 1
+
+    def _save_index(self) -> None:
+        offsets = self.offsets
+        covered = self.size
+        if self.data[-1:] != NEW_LINE:
+            offsets = offsets[:-1]
+            covered = self.offsets[-1]
+        temp_filename = f"{self._index_filename()}.{os.getpid()}"
+        try:
+            self._write_index(temp_filename, offsets, covered)
+        except OSError:
+            with suppress(OSError):
+                os.unlink(temp_filename)
+
+    def _write_index(self, temp_filename: str, offsets: array, covered: int) -> None:
+        with open(temp_filename, "wb") as file:
+            file.write(INDEX_HEADER.pack(covered, self._checksum(covered)))
+            file.write(offsets.tobytes())
+        os.replace(temp_filename, self._index_filename())
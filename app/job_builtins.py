@@ -0,0 +1,73 @@
+import asyncio
+from typing import Optional
+
+from app.command import CommandOne
+from app.jobs import Job, jobs
+from app.types import BuiltinOutput, StdinIterator
+
+CURRENT_JOB = "current"
+
+
+def _no_such_job(name: str, spec: Optional[str]) -> str:
+    job_name = spec or CURRENT_JOB
+    return f"{name}: {job_name}: no such job\n"
+
+
+async def do_bg(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    if not jobs.job_control:
+        yield None, "bg: no job control\n"
+        return
+    for spec in command.args or [None]:
+        job = jobs.find(spec)
+        if job is None:
+            yield None, _no_such_job("bg", spec)
+        elif job.is_stopped:
+            job.resume()
+            jobs.add(job)
+            mark = jobs.mark(job)
+            yield f"[{job.number}]{mark} {job.text} &\n", None
+        else:
+            yield None, f"bg: job {job.number} already in background\n"
+
+
+async def do_fg(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    if not jobs.job_control:
+        yield None, "fg: no job control\n"
+        return
+    spec = command.args[0] if command.args else None
+    job = jobs.find(spec)
+    if job is None:
+        yield None, _no_such_job("fg", spec)
+        return
+    jobs.foreground = job
+    job.resume()
+    yield f"{job.text}\n", None
+
+
+async def do_jobs(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    lines = [jobs.describe(job) for job in jobs]
+    for job in jobs:
+        if job.is_done():
+            jobs.remove(job)
+    yield "".join(lines) or None, None
+
+
+async def do_wait(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    targets: list[Job] = []
+    for spec in command.args:
+        if spec.isdigit():
+            job = jobs.find_pid(int(spec))
+        else:
+            job = jobs.find(spec)
+        if job is None:
+            yield None, f"wait: {spec}: no such job\n"
+        else:
+            targets.append(job)
+    if not command.args:
+        targets = [job for job in jobs if not job.is_stopped]
+    tasks = [job.task for job in targets if job.task is not None]
+    if tasks:
+        await asyncio.wait(tasks)
+    for job in targets:  # noqa: WPS440
+        if job.is_done():
+            jobs.remove(job)
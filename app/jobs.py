@@ -0,0 +1,267 @@
+import asyncio
+import contextvars
+import os
+import signal
+from contextlib import suppress
+from enum import StrEnum
+from typing import Any, Callable, Coroutine, Iterator, Optional
+
+JobRunner = Callable[["Job"], Coroutine[Any, Any, None]]
+JOB_SPEC_PREFIX = "%"
+CURRENT_JOB_SPECS = frozenset(("%", "%%", "%+"))
+PREVIOUS_JOB_SPEC = "%-"
+STATE_WIDTH = 24
+
+
+class JobState(StrEnum):
+    RUNNING = "Running"
+    STOPPED = "Stopped"
+    DONE = "Done"
+
+
+class Job:  # noqa: WPS214, WPS230
+    """One command line running as a task on the session's event loop.
+
+    Under job control its external processes share one process group, so the
+    whole pipeline is interrupted, stopped and continued with killpg. A job
+    started from inside another one, like each line of `parallel`, joins the
+    process group of its parent. While a job runs in the foreground, the
+    terminal belongs to its group.
+    """
+
+    def __init__(self, text: str, job_control: bool, parent: Optional["Job"] = None) -> None:
+        self.text = text
+        self.job_control = job_control
+        self.parent = parent
+        self.number = 0
+        self.status = 0
+        self.pgid: Optional[int] = None
+        self.pids: list[int] = []
+        self.running: set[int] = set()
+        self.is_stopped = False
+        self.is_interrupted = False
+        self.started = asyncio.Event()
+        self.spawn_lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def leader(self) -> "Job":
+        return self if self.parent is None else self.parent.leader
+
+    def is_done(self) -> bool:
+        return self.task is not None and self.task.done()
+
+    def state(self) -> JobState:
+        if self.is_done():
+            return JobState.DONE
+        return JobState.STOPPED if self.is_stopped else JobState.RUNNING
+
+    def process_group(self) -> Optional[int]:
+        if not self.job_control:
+            return None
+        pgid = self.leader.pgid
+        return 0 if pgid is None else pgid
+
+    def add_pid(self, pid: int) -> None:
+        self.pids.append(pid)
+        self.running.add(pid)
+        leader = self.leader
+        if leader is not self:
+            leader.pids.append(pid)
+            leader.running.add(pid)
+        if self.job_control and leader.pgid is None:
+            leader.pgid = pid
+            if terminal.owner is leader:
+                terminal.hand_over(leader)
+
+    def exited(self, pid: int) -> None:
+        leader = self.leader
+        self.running.discard(pid)
+        leader.running.discard(pid)
+        if not leader.running and terminal.owner is leader:
+            # builtins still running in the job get Ctrl-C through the shell again
+            terminal.reclaim()
+
+    def signal(self, signum: int) -> None:
+        if self.pgid is not None:
+            with suppress(ProcessLookupError):
+                os.killpg(self.pgid, signum)
+
+    def stop(self) -> None:
+        self.signal(signal.SIGTSTP)
+        self.is_stopped = True
+
+    def resume(self) -> None:
+        self.is_stopped = False
+        self.signal(signal.SIGCONT)
+
+    def interrupt(self) -> None:
+        self.is_interrupted = True
+        if self.task is not None:
+            self.task.cancel()
+
+    async def wait(self) -> None:
+        if self.task is None:
+            return
+        try:
+            await asyncio.shield(self.task)
+        except asyncio.CancelledError:
+            if not self.task.cancelled():
+                raise
+
+    async def cancel(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.wait([self.task])
+
+
+class Terminal:
+    """The controlling terminal of an interactive shell, lent to the process group of the foreground job.
+
+    A process outside the terminal's group that reads from it is stopped
+    with SIGTTIN, which hangs password prompts and the like. So the
+    terminal is handed over when the job gets its group, or is brought to
+    the foreground, and taken back before the next prompt. Keys like
+    Ctrl-C and Ctrl-Z then go straight to the job's processes.
+    """
+
+    def __init__(self) -> None:
+        self.fd: Optional[int] = None
+        self.shell_pgid = 0
+        self.owner: Optional[Job] = None
+
+    def open(self, fd: int) -> None:
+        if os.isatty(fd) and os.tcgetpgrp(fd) == os.getpgrp():
+            self.fd = fd
+            self.shell_pgid = os.getpgrp()
+
+    def lend(self, job: Job) -> None:
+        if self.fd is None:
+            return
+        self.owner = job.leader
+        self.hand_over(self.owner)
+
+    def hand_over(self, job: Job) -> None:
+        if job.pgid is not None and self._set_group(job.pgid):
+            # a process that read the terminal before it was handed over has been stopped with SIGTTIN
+            job.signal(signal.SIGCONT)
+
+    def reclaim(self) -> None:
+        self._set_group(self.shell_pgid)
+
+    def take_back(self) -> None:
+        self.owner = None
+        self.reclaim()
+
+    def _set_group(self, pgid: int) -> bool:
+        if self.fd is None:
+            return False
+        # the shell is in a background group while the terminal is lent, so it holds off SIGTTOU
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTTOU})
+        try:
+            os.tcsetpgrp(self.fd, pgid)
+        except OSError:
+            return False
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTTOU})
+        return True
+
+
+class JobTable:  # noqa: WPS214
+    """Jobs started with `&` or stopped with Ctrl-Z, numbered like bash does.
+
+    The last job put in the background or stopped is the current one (`%+`)
+    and the one before it the previous one (`%-`).
+    """
+
+    def __init__(self) -> None:
+        self.table: dict[int, Job] = {}
+        self.recent: list[Job] = []
+        self.foreground: Optional[Job] = None
+        self.job_control = False
+
+    def __iter__(self) -> Iterator[Job]:
+        return iter(list(self.table.values()))
+
+    async def start(self, runner: JobRunner, text: str, is_background: bool) -> Job:
+        job = Job(text, self.job_control)
+        context = contextvars.copy_context()
+        context.run(current_job.set, job)
+        job.task = asyncio.create_task(runner(job), context=context)
+        if is_background:
+            self.add(job)
+            started = asyncio.create_task(job.started.wait())
+            await asyncio.wait([job.task, started], return_when=asyncio.FIRST_COMPLETED)
+            started.cancel()
+        return job
+
+    def add(self, job: Job) -> None:
+        if job.number == 0:
+            job.number = max(self.table, default=0) + 1
+            self.table[job.number] = job
+        with suppress(ValueError):
+            self.recent.remove(job)
+        self.recent.append(job)
+
+    def remove(self, job: Job) -> None:
+        if self.table.get(job.number) is job:
+            del self.table[job.number]  # noqa: WPS420
+        with suppress(ValueError):
+            self.recent.remove(job)
+        task = job.task
+        if task is not None and task.done() and not task.cancelled():
+            task.exception()
+
+    def find(self, spec: Optional[str]) -> Optional[Job]:
+        if spec is None or spec in CURRENT_JOB_SPECS:
+            return self.recent[-1] if self.recent else None
+        if spec == PREVIOUS_JOB_SPEC:
+            return self.recent[-2] if len(self.recent) > 1 else None
+        name = spec.removeprefix(JOB_SPEC_PREFIX)
+        if name.isdigit():
+            return self.table.get(int(name))
+        matches = (job for job in reversed(self.recent) if job.text.startswith(name))
+        return next(matches, None)
+
+    def find_pid(self, pid: int) -> Optional[Job]:
+        return next((job for job in self if pid in job.pids), None)
+
+    def mark(self, job: Job) -> str:
+        if job is self.find(None):
+            return "+"
+        if job is self.find(PREVIOUS_JOB_SPEC):
+            return "-"
+        return " "
+
+    def describe(self, job: Job) -> str:
+        state = job.state()
+        suffix = " &" if state == JobState.RUNNING else ""
+        mark = self.mark(job)
+        padded_state = state.ljust(STATE_WIDTH)
+        return f"[{job.number}]{mark}  {padded_state}{job.text}{suffix}\n"
+
+    def reap(self) -> Iterator[str]:
+        for job in self:
+            if job.is_done():
+                description = self.describe(job)
+                self.remove(job)
+                yield description
+
+    async def close(self, wait: bool) -> None:
+        try:  # noqa: WPS501
+            if wait:
+                tasks = (job.task for job in self if not job.is_stopped)
+                running = [task for task in tasks if task is not None]
+                if running:
+                    await asyncio.wait(running)
+        finally:
+            for job in self:
+                job.signal(signal.SIGHUP)
+                job.resume()
+                await job.cancel()  # noqa: WPS476
+                self.remove(job)
+
+
+terminal = Terminal()
+current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar("current_job", default=None)
+jobs = JobTable()
@@ -0,0 +1,239 @@
+import os
+import re
+import time
+from enum import Enum, auto
+from types import MappingProxyType
+from typing import Iterator, NamedTuple, Optional
+
+from app.substitution_scanner import (
+    SUBSTITUTION_OPEN,
+    Substitution,
+    WordPart,
+    scan_double_quoted,
+    scan_substitution,
+)
+from app.tracing import parse_counter
+
+SINGLE_QUOTE = "'"
+DOUBLE_QUOTE = '"'
+BACKSLASH = "\\"
+NEW_LINE = "\n"
+BACKTICK = "`"
+DOLLAR_SIGN = "$"
+HOME_DIR = "~"
+SPACE = " "
+HOME = os.getenv("HOME", "")
+DOUBLE_QUOTE_ESCAPABLE = frozenset((DOUBLE_QUOTE, BACKSLASH, DOLLAR_SIGN, BACKTICK, NEW_LINE))
+FD_PREFIXES = frozenset(("1", "2"))
+DOUBLE_QUOTED = "double"
+QUOTED_LEXEMES = frozenset(("single", "escape", DOUBLE_QUOTED))
+WORD_LEXEMES = frozenset(("word", "home", *QUOTED_LEXEMES))
+SUBSTITUTED_LEXEMES = frozenset(("substitution", DOUBLE_QUOTED))
+OPERATOR_LEXEMES = frozenset(("operator", "pipe", "background"))
+GLOB_CHARS = frozenset("*?[")
+
+LEXEME = re.compile(
+    r"""(?P<space>\ +)
+    |(?P<word>(?:[^\ '"\\|>~&;`$]+|\$(?!\())+)
+    |'(?P<single>[^']*)'?
+    |"(?P<double>(?:[^"\\]+|\\.?)*)"?
+    |\\(?P<escape>.?)
+    |(?P<home>~)
+    |(?P<substitution>\$\(|`)
+    |(?P<operator>&&|\|\||;)
+    |(?P<pipe>\|)
+    |(?P<redirect>>>?)
+    |(?P<background>&)""",
+    re.VERBOSE | re.DOTALL,
+)
+SPECIAL_SYMBOL = re.compile(r"['\"\\\\|>~&;`$]")
+DOUBLE_QUOTE_SPECIAL = re.compile(r'\\(.?)|~', re.DOTALL)
+
+
+class TokenType(Enum):
+    WORD = auto()
+    PIPE = auto()
+    REDIRECT = auto()
+    BACKGROUND = auto()
+    AND = auto()
+    OR = auto()
+    SEMICOLON = auto()
+
+
+class Token(NamedTuple):
+    kind: TokenType
+    text: str
+    # the word as a glob pattern, quoted wildcards escaped; None when no wildcard is unquoted
+    pattern: Optional[str] = None
+    # the pieces of a word with substitutions, and the indices of its quoted strings
+    parts: Optional[tuple[WordPart, ...]] = None
+    quoted: tuple[int, ...] = ()
+
+
+OPERATORS = MappingProxyType(
+    {
+        "|": Token(TokenType.PIPE, "|"),
+        "&": Token(TokenType.BACKGROUND, "&"),
+        "&&": Token(TokenType.AND, "&&"),
+        "||": Token(TokenType.OR, "||"),
+        ";": Token(TokenType.SEMICOLON, ";"),
+    }
+)
+
+
+def has_glob(text: str) -> bool:
+    return "*" in text or "?" in text or "[" in text
+
+
+def _unescape_double_quoted(match: re.Match[str]) -> str:
+    escaped = match.group(1)
+    if escaped is None:
+        return HOME
+    if not escaped or escaped in DOUBLE_QUOTE_ESCAPABLE:
+        return escaped
+    if escaped == HOME_DIR:
+        return f"{BACKSLASH}{HOME}"
+    return f"{BACKSLASH}{escaped}"
+
+
+def escape_glob(text: str) -> str:
+    return "".join(
+        f"[{char}]" if char in GLOB_CHARS else char
+        for char in text
+    )
+
+
+class WordBuilder:
+    """The pieces of the word being lexed, joined once it ends.
+
+    Substitutions are kept apart by the index of their piece, so a word
+    without any is joined from plain strings.
+    """
+
+    def __init__(self) -> None:
+        self.texts: list[str] = []
+        self.quoted: list[int] = []
+        self.substitutions: dict[int, Substitution] = {}
+        self.is_quoted = False
+        self.is_pattern = False
+
+    def add(self, kind: str, text: str) -> None:
+        if kind == "word":
+            self.is_pattern = self.is_pattern or has_glob(text)
+            self.texts.append(text)
+            return
+        self.quoted.append(len(self.texts))
+        self.texts.append(self._piece(kind, text))
+        self.is_quoted = self.is_quoted or kind in QUOTED_LEXEMES
+
+    def add_substituted(self, line: str, match: re.Match[str]) -> int:
+        """Adds the substitution, or the double-quoted string with some, at match; the index just after it."""
+        if match.lastgroup == DOUBLE_QUOTED:
+            parts, end = scan_double_quoted(line, match.start() + 1)
+        else:
+            inner, end = scan_substitution(line, match.end(), match.group())
+            parts = [Substitution(inner, is_quoted=False)]
+        for part in parts:
+            if isinstance(part, str):
+                self.add(DOUBLE_QUOTED, part)
+            else:
+                self.substitutions[len(self.texts)] = part
+                self.texts.append(str(part))
+        return end
+
+    def take_fd_prefix(self) -> str:
+        """The word if it is the fd of the redirect right after it, like the 2 of `2>`, which then ends it."""
+        prefix = "".join(self.texts)
+        if self.is_quoted or prefix not in FD_PREFIXES:
+            return ""
+        self.texts = []
+        return prefix
+
+    def token(self) -> Optional[Token]:
+        word = "".join(self.texts)
+        if self.substitutions:
+            parts = tuple(
+                self.substitutions.get(index, text)
+                for index, text in enumerate(self.texts)
+            )
+            return Token(TokenType.WORD, word, parts=parts, quoted=tuple(self.quoted))
+        if not word:
+            return None
+        return Token(TokenType.WORD, word, self._pattern() if self.is_pattern else None)
+
+    def _pattern(self) -> str:
+        escaped = self.texts.copy()
+        for index in self.quoted:
+            escaped[index] = escape_glob(escaped[index])
+        return "".join(escaped)
+
+    def _piece(self, kind: str, text: str) -> str:
+        if kind == "home":
+            return HOME
+        if kind == DOUBLE_QUOTED and (BACKSLASH in text or HOME_DIR in text):
+            return DOUBLE_QUOTE_SPECIAL.sub(_unescape_double_quoted, text)
+        return text
+
+
+class CommandParser:
+    """Single-pass lexer producing typed tokens.
+
+    One compiled regex splits the line into lexemes, so runs of ordinary
+    characters are consumed in one step and every word is assembled from a
+    list of slices joined once. Substitutions nest, so they are scanned by hand.
+    """
+
+    def __init__(self, line: str) -> None:
+        self.tokens: list[Token] = []
+        self.word = WordBuilder()
+        started = time.perf_counter_ns()
+        self._tokenize(line)
+        parse_counter.add(time.perf_counter_ns() - started, len(line))
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __iter__(self) -> Iterator[Token]:
+        return iter(self.tokens)
+
+    def __getitem__(self, index: int) -> Token:
+        return self.tokens[index]
+
+    def _tokenize(self, line: str) -> None:
+        if SPECIAL_SYMBOL.search(line) is None:
+            words = filter(None, line.split(SPACE))
+            self.tokens.extend(
+                Token(TokenType.WORD, word, word if has_glob(word) else None)
+                for word in words
+            )
+            return
+        position = 0
+        while position < len(line):
+            position = self._add_lexemes(line, position)
+        self._end_word()
+
+    def _add_lexemes(self, line: str, position: int) -> int:
+        """Adds the lexemes from position up to a substitution; the index just after it."""
+        for match in LEXEME.finditer(line, position):
+            kind = match.lastgroup or ""
+            text = match.group(kind)
+            if kind in SUBSTITUTED_LEXEMES and (SUBSTITUTION_OPEN in text or BACKTICK in text):
+                return self.word.add_substituted(line, match)
+            if kind in WORD_LEXEMES:
+                self.word.add(kind, text)
+            else:
+                self._end_word(kind, text)
+        return len(line)
+
+    def _end_word(self, kind: str = "", text: str = "") -> None:
+        """Ends the word at a lexeme that is not part of it, then adds the token of the lexeme."""
+        prefix = self.word.take_fd_prefix() if kind == "redirect" else ""
+        if self.word.texts:
+            token = self.word.token()
+            if token is not None:
+                self.tokens.append(token)
+            self.word = WordBuilder()
+        if kind == "redirect":
+            self.tokens.append(Token(TokenType.REDIRECT, f"{prefix}{text}"))
+        elif kind in OPERATOR_LEXEMES:
+            self.tokens.append(OPERATORS[text])
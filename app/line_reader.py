@@ -0,0 +1,57 @@
+import os
+from contextlib import suppress
+from typing import TYPE_CHECKING, Iterator
+
+from app.output import output
+from app.service_functions import writeln
+
+if TYPE_CHECKING:
+    from app.executor import Executor
+
+BLOCK_SIZE = 1 << 16
+
+
+def read_interactive(executor: "Executor") -> Iterator[str]:
+    with suppress(EOFError):
+        while True:  # noqa: WPS457
+            for notice in executor.notices():
+                writeln(notice.encode(), is_stdout=False)
+            output.flush()
+            try:
+                line = input("$ ")  # noqa: WPS421
+            except KeyboardInterrupt:
+                writeln(b"\n", is_stdout=False)
+                continue
+            yield line
+
+
+def commit_history(lines: Iterator[str], filename: str) -> Iterator[str]:
+    from app.history import append_history  # noqa: WPS433
+
+    for line in lines:
+        yield line
+        append_history.commit_if_needed(filename)
+
+
+def read_lines(fd: int) -> Iterator[str]:
+    """Yields the lines read from fd, flushing the output before each read that may block.
+
+    Bytes that are not UTF-8 are kept as surrogates, like in file names, so they reach commands unchanged.
+    """
+    pending = b""
+    while True:  # noqa: WPS457
+        output.flush()
+        block = os.read(fd, BLOCK_SIZE)
+        if not block:
+            break
+        lines = (pending + block).split(b"\n")
+        pending = lines.pop()
+        yield from map(os.fsdecode, lines)
+    if pending:
+        yield os.fsdecode(pending)
+
+
+def read_script(fd: int) -> Iterator[str]:
+    for line in read_lines(fd):
+        if not line.lstrip().startswith("#"):
+            yield line
@@ -1,60 +1,145 @@
-import asyncio
 import os
-import readline
-from contextlib import suppress
-from typing import Optional
+import sys
+from contextlib import ExitStack
+from typing import TYPE_CHECKING, Iterable, Optional
 
-from app.async_command_processor import process_full
-from app.command import CommandFull, CommandOne
-from app.exceptions import EmptyCommandError, ExitError
-from app.history import append_history, read_history
-from app.service_functions import completer, writeln
+from app.command import CommandChain, CommandList, parse_cache
+from app.exceptions import CommandSyntaxError, EmptyCommandError, ExitError
+from app.line_reader import commit_history, read_interactive, read_script
+from app.output import output
+from app.service_functions import write_all, writeln
+from app.status import INTERRUPTED_STATUS, NOT_FOUND_STATUS, SYNTAX_ERROR_STATUS
+from app.sync_command_processor import BuiltinChain, is_builtin_chain
+from app.tracing import output_counter, parse_counter
+
+if TYPE_CHECKING:
+    from app.executor import Executor
 
 PATH = os.environ.get("PATH", "")
 HISTFILE = os.environ.get("HISTFILE", "")
 
 
-def write_all(
-    stdout: Optional[str],
-    stderr: Optional[str],
-    command: CommandOne,
-) -> None:
+def parse_line(line: str) -> Optional[CommandList]:
     try:
-        writeln(stdout, is_stdout=True, filename=command.stdout_file)
-    except IsADirectoryError:
-        stderr = f"bash: {command.stdout_file}: Is a directory"
-        command.stderr_file = None
+        return parse_cache.parse(line.strip())
+    except EmptyCommandError:
+        return None
+    except CommandSyntaxError as error:
+        writeln(f"bash: syntax error near unexpected token `{error}'\n".encode(), is_stdout=False)
+        return None
+
+
+class Session:
+    """The executor, made for the first chain that is not builtin-only, and the status of the last chain."""
+
+    def __init__(self, executor: Optional["Executor"]) -> None:
+        self.executor = executor
+        self.is_interactive = executor is not None
+        self.status = 0
+
+    def run_list(self, command_list: CommandList) -> None:
+        for chain in command_list:
+            status = self.run_chain(chain)
+            if status is None:
+                self.status = INTERRUPTED_STATUS
+                break
+            self.status = status
+
+    def run_chain(self, chain: CommandChain) -> Optional[int]:
+        """Status of chain, or None when Ctrl-C cut it short."""
+        if is_builtin_chain(chain):
+            return self.run_builtins(chain)
+        if self.executor is None:
+            from app.executor import Executor  # noqa: WPS433
+
+            self.executor = Executor()
+        output.flush()
+        return self.executor.run(chain)
+
+    def run_builtins(self, chain: CommandChain) -> Optional[int]:
+        builtin_chain = BuiltinChain()
+        try:
+            for stdout, stderr in builtin_chain.run(chain):
+                write_all(stdout, stderr)
+        except KeyboardInterrupt:
+            if not self.is_interactive:
+                raise
+            writeln(b"\n", is_stdout=False)
+            return None
+        return builtin_chain.status
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.close()
 
+
+def run_lines(lines: Iterable[str], executor: Optional["Executor"] = None) -> int:
+    """Runs lines and returns the status of the last chain, or the one given to exit."""
+    session = Session(executor)
     try:
-        writeln(stderr, is_stdout=False, filename=command.stderr_file)
-    except IsADirectoryError:
-        writeln(f"bash: {command.stderr_file}: Is a directory\n", is_stdout=True, filename=None)
+        for line in lines:
+            command_list = parse_line(line)
+            if command_list is not None:
+                session.run_list(command_list)
+    except KeyboardInterrupt:
+        session.status = INTERRUPTED_STATUS
+    except ExitError as error:
+        if error.status is not None:
+            session.status = error.status
+    session.close()
+    output.flush()
+    parse_counter.emit_summary()
+    output_counter.emit_summary()
+    return session.status
 
 
-async def wrapper(command: CommandFull) -> None:
-    async for stdout, stderr in process_full(command):
-        write_all(stdout=stdout, stderr=stderr, command=command.last_command)
+def run_interactive() -> int:
+    import readline  # noqa: WPS433
 
+    from app.completer import completer  # noqa: WPS433
+    from app.executor import Executor  # noqa: WPS433
+    from app.history import append_history, history  # noqa: WPS433
 
-def main() -> None:
     readline.set_completer(completer)
     readline.parse_and_bind("tab: complete")
     readline.parse_and_bind("set bell-style audible")
+    executor = Executor(job_control=True)
 
     if HISTFILE:
-        read_history(HISTFILE)
-
-    with suppress(KeyboardInterrupt, ExitError):
-        while True:  # noqa: WPS457
-            line = input("$ ").strip()  # noqa: WPS421
-            try:
-                command = CommandFull(line)
-            except EmptyCommandError:
-                continue
-            asyncio.run(wrapper(command))
+        history.open(HISTFILE)
+        status = run_lines(commit_history(read_interactive(executor), HISTFILE), executor)
+    else:
+        status = run_lines(read_interactive(executor), executor)
 
     if HISTFILE:
         append_history(HISTFILE)
+    return status
+
+
+def run_batch(lines: Iterable[str]) -> int:
+    with ExitStack() as stack:
+        stack.callback(output.flush)
+        return run_lines(lines)
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    if not args:
+        if sys.stdin.isatty():
+            sys.exit(run_interactive())
+        sys.exit(run_batch(read_script(sys.stdin.fileno())))
+    if args[0] == "-c":
+        if len(args) < 2:
+            sys.stderr.write("bash: -c: option requires an argument\n")
+            sys.exit(SYNTAX_ERROR_STATUS)
+        sys.exit(run_batch(args[1].splitlines()))
+    try:
+        script = open(args[0], "rb", buffering=0)  # noqa: WPS515
+    except OSError as error:
+        sys.stderr.write(f"bash: {args[0]}: {error.strerror}\n")
+        sys.exit(NOT_FOUND_STATUS)
+    with script:
+        sys.exit(run_batch(read_script(script.fileno())))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from app.tracing import output_counter
+
+if TYPE_CHECKING:
+    from asyncio import AbstractEventLoop
+
+    from app.event_loop import EventLoopThread
+
+OUTPUT_BUFFER_SIZE = int(os.environ.get("SHELL_OUTPUT_BUFFER_SIZE") or 1 << 16)
+STDOUT_FD = 1
+STDERR_FD = 2
+
+
+def _write_fd(fd: int, data: bytes) -> int:
+    view = memoryview(data)
+    writes = 0
+    while view:
+        view = view[os.write(fd, view) :]
+        writes += 1
+    return writes
+
+
+class OutputSink:
+    """The shell's stdout and stderr, written in batches and in the order they were produced.
+
+    Chunks queue up until the event loop tick that produced them ends, until
+    limit bytes are queued, or until flush is called before a prompt, before
+    waiting for input and at exit. Chunks of one stream go out in a single
+    write, and a chunk of the other stream flushes the queue first, so the
+    two streams interleave exactly as they were produced.
+    """
+
+    def __init__(self, limit: int = OUTPUT_BUFFER_SIZE) -> None:
+        self.limit = limit
+        self.chunks: list[bytes] = []
+        self.size = 0
+        self.is_stdout = True
+        self.lock = threading.Lock()
+        self.event_loop: Optional["EventLoopThread"] = None
+
+    def attach(self, event_loop: "EventLoopThread") -> None:
+        """Flushes what is written on the thread of event_loop once each tick of its loop ends."""
+        self.event_loop = event_loop
+
+    def detach(self) -> None:
+        self.flush()
+        self.event_loop = None
+
+    def write(self, data: Optional[bytes], is_stdout: bool) -> None:
+        if not data:
+            return
+        with self.lock:
+            if is_stdout != self.is_stdout:
+                self._flush()
+                self.is_stdout = is_stdout
+            loop = None if self.chunks else self._tick_loop()
+            if loop is not None:
+                loop.call_soon(self.flush)
+            self.chunks.append(data)
+            self.size += len(data)
+            output_counter.queued()
+            if self.size >= self.limit:
+                self._flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            self._flush()
+
+    def _tick_loop(self) -> Optional["AbstractEventLoop"]:
+        """The attached loop, when called on its thread."""
+        event_loop = self.event_loop
+        if event_loop is None or threading.current_thread() is not event_loop.thread:
+            return None
+        return event_loop.loop
+
+    def _flush(self) -> None:
+        if not self.chunks:
+            return
+        data = b"".join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        fd = STDOUT_FD if self.is_stdout else STDERR_FD
+        output_counter.written(_write_fd(fd, data), len(data))
+
+
+output = OutputSink()
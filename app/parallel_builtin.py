@@ -0,0 +1,84 @@
+import asyncio
+import os
+from typing import AsyncIterator, Optional
+
+from app.async_command_processor import process_chain
+from app.command import CommandList, CommandOne, parse_cache
+from app.exceptions import CommandSyntaxError, EmptyCommandError
+from app.jobs import Job, current_job
+from app.status import SYNTAX_ERROR_STATUS
+from app.subshell import Subshell
+from app.types import BuiltinOutput, CommandResult, StdinIterator
+
+PARALLEL_USAGE = "parallel: usage: parallel [-j jobs] [command ...]\n"
+LineResult = tuple[CommandResult, int]
+
+
+def _decode(chunks: list[bytes]) -> Optional[str]:
+    return b"".join(chunks).decode(errors="replace") or None
+
+
+async def _collect_output(command_list: CommandList, job: Job) -> CommandResult:
+    stdout: list[bytes] = []
+    stderr: list[bytes] = []
+    # each line is a subshell, so a `cd` in one moves neither the others nor the shell
+    with Subshell(job):
+        for chain in command_list:
+            async for stdout_chunk, stderr_chunk in process_chain(chain, job):
+                stdout.append(stdout_chunk or b"")
+                stderr.append(stderr_chunk or b"")
+    return _decode(stdout), _decode(stderr)
+
+
+async def _run_parallel_line(line: str, semaphore: asyncio.Semaphore) -> LineResult:
+    async with semaphore:
+        try:
+            command_list = parse_cache.parse(line)
+        except EmptyCommandError:
+            return (None, None), 0
+        except CommandSyntaxError as error:
+            message = f"bash: syntax error near unexpected token `{error}'\n"
+            return (None, message), SYNTAX_ERROR_STATUS
+        parent = current_job.get()
+        job = Job(line, parent is not None and parent.job_control, parent)
+        return await _collect_output(command_list, job), job.status
+
+
+async def _run_lines(lines: list[str], workers: int) -> AsyncIterator[LineResult]:
+    semaphore = asyncio.Semaphore(workers)
+    tasks = [asyncio.create_task(_run_parallel_line(line, semaphore)) for line in lines]
+    try:  # noqa: WPS501
+        for finished in asyncio.as_completed(tasks):
+            yield await finished  # noqa: WPS476
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _pop_workers(args: list[str]) -> int:
+    if not args or not args[0].startswith("-j"):
+        return os.cpu_count() or 1
+    value = args.pop(0)[2:]
+    if not value and args:
+        value = args.pop(0)
+    return int(value) if value.isdigit() else 0
+
+
+async def _read_lines(stdin: StdinIterator) -> list[str]:
+    chunks = [chunk async for chunk in stdin]
+    return b"".join(chunks).decode(errors="replace").splitlines()
+
+
+async def do_parallel(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    args = list(command.args)
+    workers = _pop_workers(args)
+    if workers == 0:
+        yield None, PARALLEL_USAGE
+        return
+    args = args or await _read_lines(stdin)
+    failed = 0
+    async for output, status in _run_lines(args, workers):
+        failed += int(status != 0)
+        yield output
+    if failed:
+        yield None, f"parallel: {failed} of {len(args)} jobs failed\n"
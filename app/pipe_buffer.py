@@ -0,0 +1,125 @@
+import asyncio
+import os
+from collections import deque
+from typing import Optional
+
+from app.types import StreamResult
+
+PIPE_HIGH_WATER = int(os.environ.get("SHELL_PIPE_HIGH_WATER") or 1 << 18)
+PIPE_LOW_WATER = int(os.environ.get("SHELL_PIPE_LOW_WATER") or PIPE_HIGH_WATER // 4)
+
+
+class WaterMarks:
+    """Byte count of one buffered stream: writers pause at high_water and resume at low_water."""
+
+    def __init__(self, high_water: int = PIPE_HIGH_WATER, low_water: int = PIPE_LOW_WATER) -> None:
+        self.high_water = high_water
+        self.low_water = min(low_water, high_water)
+        self.size = 0
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+    def add(self, size: int) -> None:
+        self.size += size
+        if self.size >= self.high_water:
+            self.writable.clear()
+
+    def remove(self, size: int) -> None:
+        self.size -= size
+        if self.size <= self.low_water:
+            self.writable.set()
+
+    def reset(self) -> None:
+        self.size = 0
+        self.writable.set()
+
+
+class PipeBuffer:
+    """A bounded edge between two pipeline stages.
+
+    put() returns once the chunk is queued unless the buffer has reached its
+    high water mark, and get() returns b"" after close(). Once the reader is
+    gone, discard() drops everything and releases the writers.
+    """
+
+    def __init__(self, high_water: int = PIPE_HIGH_WATER, low_water: int = PIPE_LOW_WATER) -> None:
+        self.chunks: deque[bytes] = deque()
+        self.marks = WaterMarks(high_water, low_water)
+        self.readable = asyncio.Event()
+        self.is_closed = False
+        self.is_discarding = False
+
+    async def put(self, chunk: bytes) -> None:
+        if self.is_discarding:
+            return
+        self.chunks.append(chunk)
+        self.marks.add(len(chunk))
+        self.readable.set()
+        await self.marks.writable.wait()
+
+    async def get(self) -> bytes:
+        while not self.chunks:
+            if self.is_closed:
+                return b""
+            self.readable.clear()
+            await self.readable.wait()
+        chunk = self.chunks.popleft()
+        self.marks.remove(len(chunk))
+        return chunk
+
+    def close(self) -> None:
+        self.is_closed = True
+        self.readable.set()
+
+    def discard(self) -> None:
+        self.is_discarding = True
+        self.chunks.clear()
+        self.marks.reset()
+
+
+class OutputBuffer:
+    """Output of a pipeline for its consumer, stdout and stderr in the order they were produced.
+
+    Each stream has its own water marks, so a stage flooding stderr never
+    holds up stdout, nor the other way round.
+    """
+
+    def __init__(self, high_water: int = PIPE_HIGH_WATER, low_water: int = PIPE_LOW_WATER) -> None:
+        self.results: deque[StreamResult] = deque()
+        self.stdout_marks = WaterMarks(high_water, low_water)
+        self.stderr_marks = WaterMarks(high_water, low_water)
+        self.readable = asyncio.Event()
+        self.is_closed = False
+
+    async def put(self, chunk: bytes, is_stdout: bool) -> None:
+        marks = self.stdout_marks if is_stdout else self.stderr_marks
+        self.results.append((chunk, None) if is_stdout else (None, chunk))
+        marks.add(len(chunk))
+        self.readable.set()
+        await marks.writable.wait()
+
+    async def get(self) -> Optional[StreamResult]:
+        while not self.results:
+            if self.is_closed:
+                return None
+            self.readable.clear()
+            await self.readable.wait()
+        stdout, stderr = self.results.popleft()
+        if stdout is not None:
+            self.stdout_marks.remove(len(stdout))
+        if stderr is not None:
+            self.stderr_marks.remove(len(stderr))
+        return stdout, stderr
+
+    def close(self) -> None:
+        self.is_closed = True
+        self.readable.set()
+
+    def __aiter__(self) -> "OutputBuffer":
+        return self
+
+    async def __anext__(self) -> StreamResult:
+        result = await self.get()
+        if result is None:
+            raise StopAsyncIteration
+        return result
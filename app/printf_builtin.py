@@ -0,0 +1,73 @@
+import re
+from types import MappingProxyType
+
+from app.command import CommandOne
+from app.coreutils import is_option
+from app.types import BuiltinOutput, StdinIterator
+
+PRINTF_ESCAPES = MappingProxyType(
+    {
+        "n": "\n",
+        "t": "\t",
+        "\\": "\\",
+        "a": "\a",
+        "r": "\r",
+        '"': '"',
+        "'": "'",
+    }
+)
+PRINTF_ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+PRINTF_CONVERSION = re.compile(r"%(-?\d*)([sdi%])")
+PRINTF_ANY_CONVERSION = re.compile(r"%[^%]?")
+
+
+def supports_printf(args: tuple[str, ...]) -> bool:
+    if not args or is_option(args[0]):
+        return False
+    template = args[0]
+    if any(escaped not in PRINTF_ESCAPES for escaped in PRINTF_ESCAPE.findall(template)):
+        return False
+    return len(PRINTF_ANY_CONVERSION.findall(template)) == len(PRINTF_CONVERSION.findall(template))
+
+
+def _unescape(match: re.Match[str]) -> str:
+    return PRINTF_ESCAPES[match.group(1)]
+
+
+class PrintfArguments:
+    """Fills the conversions of a printf format, taking one argument for each like bash does."""
+
+    def __init__(self, args: tuple[str, ...]) -> None:
+        self.args = list(args)
+        self.errors: list[str] = []
+
+    def fill(self, template: str) -> str:
+        """The template repeated until every argument is used, and at least once."""
+        conversions = PRINTF_CONVERSION.findall(template)
+        takes_arguments = any(kind != "%" for _, kind in conversions)
+        output = [PRINTF_CONVERSION.sub(self.convert, template)]
+        while self.args and takes_arguments:
+            output.append(PRINTF_CONVERSION.sub(self.convert, template))
+        return "".join(output)
+
+    def convert(self, match: re.Match[str]) -> str:
+        width, kind = match.groups()
+        if kind == "%":
+            return "%"
+        value = self.args.pop(0) if self.args else ""
+        spec = width.replace("-", "<") if width.startswith("-") else f">{width}"
+        if kind == "s":
+            return format(value, spec)
+        try:
+            number = int(value or "0")
+        except ValueError:
+            self.errors.append(f"printf: {value}: invalid number\n")
+            number = 0
+        return format(number, spec)
+
+
+async def do_printf(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    arguments = PrintfArguments(command.args[1:])
+    output = arguments.fill(PRINTF_ESCAPE.sub(_unescape, command.args[0]))
+    errors = "".join(arguments.errors)
+    yield output or None, errors or None
@@ -0,0 +1,57 @@
+import os
+from typing import Optional
+
+from app.command import STDOUT_FD, CommandOne
+from app.exceptions import RedirectionError
+from app.subshell import resolve
+
+FILE_MODE = 0o666
+
+
+class Redirection:
+    """An output file opened once for the whole command and written with direct fd writes."""
+
+    def __init__(self, filename: str, append: bool) -> None:
+        flags = os.O_WRONLY | os.O_CREAT
+        flags |= os.O_APPEND if append else os.O_TRUNC
+        try:
+            self.fd = os.open(resolve(filename), flags, FILE_MODE)
+        except OSError as error:
+            raise RedirectionError(f"bash: {filename}: {error.strerror}\n") from error
+
+    def write(self, chunk: bytes) -> None:
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(self.fd, view) :]
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Redirections:
+    def __init__(self) -> None:
+        self.stdout: Optional[Redirection] = None
+        self.stderr: Optional[Redirection] = None
+
+    @classmethod
+    def open(cls, command: CommandOne) -> "Redirections":
+        redirections = cls()
+        for redirect in command.redirects:
+            try:
+                redirection = Redirection(redirect.filename, redirect.is_append)
+            except RedirectionError:
+                redirections.close()
+                raise
+            if redirect.fd == STDOUT_FD:
+                redirections.stdout = redirection
+            else:
+                redirections.stderr = redirection
+        return redirections
+
+    def close(self) -> None:
+        if self.stdout is not None:
+            self.stdout.close()
+            self.stdout = None
+        if self.stderr is not None:
+            self.stderr.close()
+            self.stderr = None
@@ -0,0 +1,167 @@
+"""Shell server: keeps the interpreter, its imports and caches warm for app.client.
+
+    python -m app.server
+
+Each session is forked from the server once its request has arrived, so it
+starts with everything already imported and with the parse cache and PATH
+hash the server has built up, and it gets its own cwd, environment and
+process group without affecting other sessions. The forks are awaited on
+the server's event loop, so sessions run concurrently. Settings read at
+import time, like SHELL_NATIVE_UTILS or SHELL_TRACE, come from the
+environment of the server.
+"""
+
+import asyncio
+import os
+import signal
+import socket
+import struct
+import sys
+from contextlib import ExitStack, suppress
+from importlib import import_module
+from itertools import chain
+from typing import Iterator
+
+from app.builtin import is_builtin
+from app.client import INTERRUPT, SOCKET_PATH, STATUS
+from app.command import CommandOne, parse_cache
+from app.exceptions import CommandSyntaxError, EmptyCommandError
+from app.server_session import SessionRequest, fork_session, readable, receive_request
+from app.service_functions import find_executable_file
+from app.status import FAILURE_STATUS, exit_status
+
+PEER_CREDENTIALS = struct.Struct("3i")
+SOCKET_MODE = 0o600
+# imported by the first session that needs them otherwise, and then again by every later one
+PRELOADED_MODULES = ("app.executor", "app.job_builtins", "app.parallel_builtin")
+
+
+def _commands(line: str) -> Iterator[CommandOne]:
+    try:
+        command_list = parse_cache.parse(line.strip())
+    except (EmptyCommandError, CommandSyntaxError):
+        return
+    for command_chain in command_list:
+        for pipeline in command_chain.pipelines:
+            yield from pipeline.commands
+
+
+def warm_up(request: SessionRequest) -> None:
+    """Parses `-c` lines and looks up their commands here, so later sessions find them cached."""
+    args = request.args
+    if len(args) < 2 or args[0] != "-c":
+        return
+    path = request.env.get(b"PATH")
+    if path is not None:
+        os.environb[b"PATH"] = path
+    for command in chain.from_iterable(map(_commands, args[1].splitlines())):
+        if not command.patterns and not is_builtin(command):
+            find_executable_file(command[0])
+
+
+def _is_owner(conn: socket.socket) -> bool:
+    credentials = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEER_CREDENTIALS.size)
+    _, uid, _ = PEER_CREDENTIALS.unpack(credentials)
+    return uid == os.getuid()
+
+
+class ShellServer:
+    """Accepts client sessions on a Unix socket only the owner can connect to."""
+
+    def __init__(self, path: str = SOCKET_PATH) -> None:
+        self.path = path
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sessions: set[asyncio.Task[None]] = set()
+
+    def bind(self) -> None:
+        with suppress(FileNotFoundError):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                if probe.connect_ex(self.path) == 0:
+                    raise OSError(f"a server is already listening on {self.path}")
+            os.unlink(self.path)
+        self.listener.bind(self.path)
+        # nobody can connect before listen(), so the mode is set in time
+        os.chmod(self.path, SOCKET_MODE)
+        self.listener.listen()
+        self.listener.setblocking(False)
+
+    async def serve(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopped.cancel)
+        accept_task = asyncio.create_task(self._accept())
+        try:
+            await stopped
+        except asyncio.CancelledError:
+            accept_task.cancel()
+        finally:
+            self.listener.close()
+            os.unlink(self.path)
+        if self.sessions:
+            await asyncio.wait(self.sessions)
+
+    async def _accept(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self.listener.fileno() != -1:
+            conn, _ = await loop.sock_accept(self.listener)
+            task = asyncio.create_task(self._session(conn))
+            self.sessions.add(task)
+            task.add_done_callback(self.sessions.discard)
+
+    async def _session(self, conn: socket.socket) -> None:
+        with conn:
+            conn.setblocking(False)
+            if not _is_owner(conn):
+                return
+            try:
+                request, fds = await receive_request(conn)
+            except (OSError, ValueError):
+                return
+            warm_up(request)
+            pid = fork_session(request, fds, [self.listener, conn])
+            status = await self._wait(pid, conn)
+            with suppress(OSError):
+                await asyncio.get_running_loop().sock_sendall(conn, STATUS.pack(status))
+
+    async def _wait(self, pid: int, conn: socket.socket) -> int:
+        with ExitStack() as stack:
+            pidfd = os.pidfd_open(pid)
+            stack.callback(os.close, pidfd)
+            exited = asyncio.create_task(readable(pidfd))
+            stack.callback(exited.cancel)
+            await self._forward_interrupts(pid, conn, exited)
+        return exit_status(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]))
+
+    async def _forward_interrupts(self, pid: int, conn: socket.socket, exited: "asyncio.Task[None]") -> None:
+        loop = asyncio.get_running_loop()
+        while not exited.done():
+            message = asyncio.create_task(loop.sock_recv(conn, 1))
+            await asyncio.wait((exited, message), return_when=asyncio.FIRST_COMPLETED)
+            if not message.done():
+                message.cancel()
+                with suppress(asyncio.CancelledError):
+                    await message
+                return
+            is_interrupt = message.exception() is None and message.result() == INTERRUPT
+            with suppress(ProcessLookupError):
+                # a client that is gone hangs up its session, like closing a terminal
+                os.killpg(pid, signal.SIGINT if is_interrupt else signal.SIGHUP)
+            if not is_interrupt:
+                await exited
+
+
+def main() -> None:
+    for module in PRELOADED_MODULES:
+        import_module(module)
+    server = ShellServer()
+    try:
+        server.bind()
+    except OSError as error:
+        sys.stderr.write(f"shell server: {error}\n")
+        sys.exit(FAILURE_STATUS)
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""One client session of app.server: the request it sends and the fork that runs it."""
+
+import asyncio
+import os
+import signal
+import socket
+import sys
+from contextlib import ExitStack, suppress
+from typing import NamedTuple, NoReturn, Union
+
+from app.client import LENGTH, SEPARATOR, STDIO_FDS
+from app.main import main as run_main
+from app.status import FAILURE_STATUS
+
+RECEIVE_SIZE = 1 << 16
+
+
+class SessionRequest(NamedTuple):
+    args: list[str]
+    cwd: bytes
+    env: dict[bytes, bytes]
+
+    @classmethod
+    def decode(cls, request: bytes) -> "SessionRequest":
+        count, *fields = request.split(SEPARATOR)
+        args = [os.fsdecode(arg) for arg in fields[: int(count)]]
+        cwd, *env = fields[int(count) :]
+        return cls(
+            args,
+            cwd,
+            dict(item.partition(b"=")[::2] for item in env),
+        )
+
+    @classmethod
+    def size(cls, data: bytes) -> int:
+        """Bytes of the length-prefixed request that starts data, as far as data tells."""
+        if len(data) < LENGTH.size:
+            return LENGTH.size
+        return LENGTH.size + LENGTH.unpack_from(data)[0]
+
+
+async def readable(fd: Union[int, socket.socket]) -> None:
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    with ExitStack() as stack:
+        loop.add_reader(fd, ready.set_result, None)
+        stack.callback(loop.remove_reader, fd)
+        await ready
+
+
+async def receive_request(conn: socket.socket) -> tuple[SessionRequest, list[int]]:
+    data = b""
+    fds: list[int] = []
+    while len(data) < SessionRequest.size(data):
+        await readable(conn)
+        chunk, chunk_fds, *_ = socket.recv_fds(conn, RECEIVE_SIZE, len(STDIO_FDS))
+        fds.extend(chunk_fds)
+        if not chunk:
+            raise ConnectionError("client closed the session")
+        data += chunk
+    return SessionRequest.decode(data[LENGTH.size :]), fds
+
+
+def _enter_session(request: SessionRequest, fds: list[int], inherited: list[socket.socket]) -> None:
+    os.setpgid(0, 0)
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    for sock in inherited:
+        sock.close()
+    for fd, target in zip(fds, STDIO_FDS):
+        os.dup2(fd, target)
+        os.close(fd)
+    os.environb.clear()
+    os.environb.update(request.env)
+    sys.argv = [sys.argv[0], *request.args]
+
+
+def _run_main(request: SessionRequest, fds: list[int], inherited: list[socket.socket]) -> int:
+    """Runs app.main with the client's stdio, cwd and environment."""
+    _enter_session(request, fds, inherited)
+    try:
+        os.chdir(request.cwd)
+    except OSError as error:
+        directory = os.fsdecode(request.cwd)
+        sys.stderr.write(f"bash: {directory}: {error.strerror}\n")
+        return FAILURE_STATUS
+    try:
+        run_main()
+    except SystemExit as exit_error:
+        code = exit_error.code
+        if code is None or isinstance(code, int):
+            return code or 0
+        sys.stderr.write(f"{code}\n")
+        return FAILURE_STATUS
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return 0
+
+
+def run_session(request: SessionRequest, fds: list[int], inherited: list[socket.socket]) -> NoReturn:
+    status = FAILURE_STATUS
+    try:
+        status = _run_main(request, fds, inherited)
+    except Exception:
+        sys.excepthook(*sys.exc_info())
+    finally:
+        # whatever happens, the fork never returns into the server's code
+        os._exit(status)  # noqa: WPS437
+
+
+def fork_session(request: SessionRequest, fds: list[int], inherited: list[socket.socket]) -> int:
+    """Forks the session for request in its own process group; the server's copies of fds are closed."""
+    with ExitStack() as stack:
+        for fd in fds:
+            stack.callback(os.close, fd)
+        pid = os.fork()
+        if not pid:
+            run_session(request, fds, inherited)
+    with suppress(OSError):
+        os.setpgid(pid, pid)
+    return pid
@@ -0,0 +1,13 @@
+import signal
+
+FAILURE_STATUS = 1
+SYNTAX_ERROR_STATUS = 2
+CANNOT_EXECUTE_STATUS = 126
+NOT_FOUND_STATUS = 127
+SIGNAL_STATUS_BASE = 128
+INTERRUPTED_STATUS = SIGNAL_STATUS_BASE + signal.SIGINT
+
+
+def exit_status(returncode: int) -> int:
+    """Status of a process as the shell reports it, 128 + N for one killed by signal N."""
+    return SIGNAL_STATUS_BASE - returncode if returncode < 0 else returncode
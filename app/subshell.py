@@ -0,0 +1,87 @@
+"""Subshells, which bash forks and this shell runs in its own process.
+
+A background chain, a line of `parallel` and a command substitution each
+run in one. What they change stays there: `cd` moves only the subshell's working directory,
+`exit` ends only the subshell, and `hash` and `history -r` leave the
+shell's tables alone.
+The working directory is never changed for the whole process, so paths
+given to commands in a subshell are resolved against its own.
+"""
+
+import errno
+import os
+from contextvars import ContextVar, Token
+from types import TracebackType
+from typing import TYPE_CHECKING, Optional
+
+from app.exceptions import ExitError
+
+if TYPE_CHECKING:
+    from app.jobs import Job
+
+
+SubshellToken = Token[Optional["Subshell"]]
+
+
+class Subshell:
+    """Made current while its block runs, and inherited by the tasks started in it.
+
+    `exit` in the block ends it, with its status, if any, as the status of job.
+    """
+
+    def __init__(self, job: Optional["Job"] = None) -> None:
+        self.job = job
+        self.directory = current_directory()
+        self.token: Optional[SubshellToken] = None
+
+    def __enter__(self) -> "Subshell":
+        self.token = current_subshell.set(self)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> bool:
+        if self.token is not None:
+            current_subshell.reset(self.token)
+        if not isinstance(exc_value, ExitError):
+            return False
+        if self.job is not None and exc_value.status is not None:
+            self.job.status = exc_value.status
+        return True
+
+
+def is_subshell() -> bool:
+    return current_subshell.get() is not None
+
+
+def subshell_directory() -> Optional[str]:
+    """Working directory of the current subshell, None outside one, where it is the process's."""
+    subshell = current_subshell.get()
+    return None if subshell is None else subshell.directory
+
+
+def current_directory() -> str:
+    return subshell_directory() or os.getcwd()
+
+
+def resolve(path: str) -> str:
+    """path as seen from the current working directory, unchanged outside a subshell."""
+    directory = subshell_directory()
+    return path if directory is None else os.path.join(directory, path)
+
+
+def change_directory(path: str) -> None:
+    subshell = current_subshell.get()
+    if subshell is None:
+        os.chdir(path)
+        return
+    directory = os.path.realpath(os.path.join(subshell.directory, path))
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+    subshell.directory = directory
+
+
+current_subshell: ContextVar[Optional[Subshell]] = ContextVar("current_subshell", default=None)
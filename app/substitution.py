@@ -0,0 +1,143 @@
+import os
+import re
+from typing import Iterable, Iterator, Optional
+
+from app.command import CommandList, CommandOne, parse_cache
+from app.exceptions import CommandSyntaxError, EmptyCommandError
+from app.lexer import Token, escape_glob, has_glob
+from app.service_functions import writeln
+from app.substitution_scanner import Substitution
+from app.types import StreamResult
+
+SUBSTITUTION_LIMIT = int(os.environ.get("SHELL_SUBSTITUTION_LIMIT") or 1 << 24)
+FIELD_SEPARATOR = re.compile(r"[ \t\n]+")
+TRAILING_NEWLINES = "\n"
+
+
+class CaptureBuffer:
+    """Stdout of a command substitution, kept up to limit bytes; the rest is read and dropped."""
+
+    def __init__(self, limit: int = SUBSTITUTION_LIMIT) -> None:
+        self.limit = limit
+        self.chunks: list[bytes] = []
+        self.size = 0
+        self.is_truncated = False
+
+    def add(self, result: StreamResult) -> None:
+        """Keeps the stdout of result; its stderr goes straight to the shell's."""
+        stdout, stderr = result
+        writeln(stderr, is_stdout=False)
+        if not stdout:
+            return
+        room = self.limit - self.size
+        if len(stdout) > room:
+            stdout = stdout[:room]
+            self.is_truncated = True
+        self.chunks.append(stdout)
+        self.size += len(stdout)
+
+    def text(self) -> str:
+        if self.is_truncated:
+            writeln(f"bash: command substitution: output truncated to {self.limit} bytes\n".encode(), is_stdout=False)
+        return os.fsdecode(b"".join(self.chunks)).rstrip(TRAILING_NEWLINES)
+
+
+def parse_substitution(line: str) -> Optional[CommandList]:
+    try:
+        return parse_cache.parse(line.strip())
+    except EmptyCommandError:
+        return None
+    except CommandSyntaxError as error:
+        writeln(f"bash: command substitution: syntax error near unexpected token `{error}'\n".encode(), is_stdout=False)
+        return None
+
+
+def substitution_lines(command: CommandOne) -> Iterator[str]:
+    for _, word in command.substitutions:
+        for part in word.parts or ():
+            if isinstance(part, Substitution):
+                yield part.line
+
+
+class Field:
+    """One word made from a substituted word; unquoted output is split on whitespace into several."""
+
+    def __init__(self) -> None:
+        self.words: list[str] = []
+        self.pattern: list[str] = []
+        self.is_pattern = False
+        self.is_kept = False
+
+    def add(self, text: str, is_quoted: bool) -> None:
+        self.words.append(text)
+        self.pattern.append(escape_glob(text) if is_quoted else text)
+        self.is_pattern = self.is_pattern or (not is_quoted and has_glob(text))
+        self.is_kept = self.is_kept or is_quoted or bool(text)
+
+    def split(self, output: str) -> list["Field"]:
+        """This field and the ones after it, with the unquoted output spread over them."""
+        first, *rest = FIELD_SEPARATOR.split(output)
+        self.add(first, is_quoted=False)
+        fields = [self]
+        for piece in rest:
+            field = Field()
+            field.add(piece, is_quoted=False)
+            fields.append(field)
+        return fields
+
+    def text(self) -> str:
+        return "".join(self.words)
+
+    def glob(self) -> Optional[str]:
+        return "".join(self.pattern) if self.is_pattern else None
+
+
+class Expansion:
+    """The words of a command, and their glob patterns, with substitutions replaced by their output."""
+
+    def __init__(self, command: CommandOne, outputs: Iterator[str]) -> None:
+        self.outputs = outputs
+        self.substituted = dict(command.substitutions)
+        self.old_patterns = dict(command.patterns)
+        self.words: list[str] = []
+        self.patterns: list[tuple[int, str]] = []
+
+    def add_word(self, index: int, text: str) -> None:
+        word = self.substituted.get(index)
+        if word is None:
+            self.add(text, self.old_patterns.get(index))
+        else:
+            self.add_substituted(word)
+
+    def add(self, text: str, pattern: Optional[str]) -> None:
+        if pattern is not None:
+            self.patterns.append((len(self.words), pattern))
+        self.words.append(text)
+
+    def add_substituted(self, word: Token) -> None:
+        fields = [Field()]
+        for index, part in enumerate(word.parts or ()):
+            if isinstance(part, str):
+                fields[-1].add(part, index in word.quoted)
+            elif part.is_quoted:
+                fields[-1].add(next(self.outputs), is_quoted=True)
+            else:
+                fields.extend(fields.pop().split(next(self.outputs)))
+        for field in fields:
+            if field.is_kept:
+                self.add(field.text(), field.glob())
+
+
+def expand_substitutions(command: CommandOne, outputs: Iterable[str]) -> CommandOne:
+    """The command with the output of each substitution, in order, in place of it.
+
+    Raises EmptyCommandError when no word is left, like for `$(true)`.
+    """
+    if not command.substitutions:
+        return command
+    expansion = Expansion(command, iter(outputs))
+    for index, text in enumerate(command.tokens):
+        expansion.add_word(index, text)
+    if not expansion.words:
+        raise EmptyCommandError
+    return command.with_words(tuple(expansion.words), tuple(expansion.patterns))
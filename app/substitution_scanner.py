@@ -0,0 +1,88 @@
+import re
+from types import MappingProxyType
+from typing import NamedTuple, Union
+
+SINGLE_QUOTE = "'"
+DOUBLE_QUOTE = '"'
+BACKSLASH = "\\"
+BACKTICK = "`"
+SUBSTITUTION_OPEN = "$("
+DOUBLE_QUOTE_STOPS = frozenset((DOUBLE_QUOTE, BACKTICK, SUBSTITUTION_OPEN))
+PARENTHESES = MappingProxyType({"(": 1, ")": -1})
+# the rest of a quoted string, from just after its opening quote; an unclosed one runs to the end of the line
+QUOTED = MappingProxyType(
+    {
+        SINGLE_QUOTE: re.compile(r"[^']*'?"),
+        DOUBLE_QUOTE: re.compile(r'(?:[^"\\]+|\\.?)*"?', re.DOTALL),
+        BACKTICK: re.compile(r"(?P<body>(?:[^`\\]+|\\.?)*)`?", re.DOTALL),
+    }
+)
+BACKTICK_ESCAPE = re.compile(r"\\([`$\\])")
+
+
+class Substitution(NamedTuple):
+    """`$(line)` or a backticked line inside a word, replaced by its output when the command runs."""
+
+    line: str
+    is_quoted: bool
+
+    def __str__(self) -> str:
+        return f"{SUBSTITUTION_OPEN}{self.line})"
+
+
+WordPart = Union[str, Substitution]
+
+
+def _scan_backticks(line: str, start: int) -> tuple[str, int]:
+    """In backticks, a backslash escapes `, $ and itself."""
+    match = next(QUOTED[BACKTICK].finditer(line, start))
+    return BACKTICK_ESCAPE.sub(r"\1", match.group("body")), match.end()
+
+
+def _scan_parenthesized(line: str, start: int) -> tuple[str, int]:
+    """Quoted strings and nested parentheses are skipped over while looking for the closing one."""
+    depth = 1
+    index = start
+    while index < len(line):
+        char = line[index]
+        quoted = QUOTED.get(char)
+        if quoted is not None:
+            index = next(quoted.finditer(line, index + 1)).end()
+            continue
+        if char == BACKSLASH:
+            index += 1
+        depth += PARENTHESES.get(char, 0)
+        if not depth:
+            return line[start:index], index + 1
+        index += 1
+    return line[start:], len(line)
+
+
+def scan_substitution(line: str, start: int, opener: str) -> tuple[str, int]:
+    """The command line of a substitution opened just before start, and the index after it.
+
+    An unclosed substitution runs to the end of the line, as unclosed quotes do.
+    """
+    if opener == BACKTICK:
+        return _scan_backticks(line, start)
+    return _scan_parenthesized(line, start)
+
+
+def scan_double_quoted(line: str, start: int) -> tuple[list[WordPart], int]:
+    """The raw strings and the substitutions of a double-quoted string opened just before start."""
+    parts: list[WordPart] = []
+    literal_start = start
+    index = start
+    while index < len(line):
+        opener = SUBSTITUTION_OPEN if line.startswith(SUBSTITUTION_OPEN, index) else line[index]
+        if opener not in DOUBLE_QUOTE_STOPS:
+            index += 2 if opener == BACKSLASH else 1
+            continue
+        parts.append(line[literal_start:index])
+        if opener == DOUBLE_QUOTE:
+            return parts, index + 1
+        inner, index = scan_substitution(line, index + len(opener), opener)
+        parts.append(Substitution(inner, is_quoted=True))
+        literal_start = index
+    parts.append(line[literal_start:])
+    return parts, len(line)
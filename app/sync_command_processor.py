@@ -0,0 +1,153 @@
+import os
+import time
+from contextlib import closing, suppress
+from typing import Iterator, Optional, Union
+
+from app.builtin import DEFAULT_HANDLERS, NATIVE_HANDLERS, is_builtin
+from app.command import CommandChain, CommandFull, CommandOne
+from app.command_type import CommandType
+from app.exceptions import EmptyCommandError, RedirectionError
+from app.redirection import Redirections
+from app.service_functions import writeln
+from app.status import FAILURE_STATUS
+from app.subshell import Subshell
+from app.substitution import CaptureBuffer, expand_substitutions, parse_substitution, substitution_lines
+from app.sync_iteration import iterate, replay
+from app.tracing import PipelineStats, tracer
+from app.types import StreamResult
+from app.wildcard import expand_command
+
+# these wait on jobs and tasks of the event loop
+LOOP_BUILTINS = frozenset(
+    (CommandType.BG, CommandType.FG, CommandType.JOBS, CommandType.PARALLEL, CommandType.WAIT),
+)
+
+
+def _is_plain_builtin(command: CommandOne) -> bool:
+    if command.patterns and command.patterns[0][0] == 0:
+        return False
+    if command.substitutions and command.substitutions[0][0] == 0:
+        return False
+    if not all(map(is_builtin_line, substitution_lines(command))):
+        return False
+    return is_builtin(command) and command.cmd_type not in LOOP_BUILTINS
+
+
+def is_builtin_only(command_full: CommandFull) -> bool:
+    commands = command_full.commands
+    # stages run one after another here, so a file passed through a pipeline would be held whole
+    has_natives = any(command.cmd_type in NATIVE_HANDLERS for command in commands)
+    if has_natives and len(commands) > 1:
+        return False
+    return all(_is_plain_builtin(command) for command in commands)
+
+
+def is_builtin_chain(chain: CommandChain) -> bool:
+    return not chain.is_background and all(is_builtin_only(pipeline) for pipeline in chain.pipelines)
+
+
+def is_builtin_line(line: str) -> bool:
+    command_list = parse_substitution(line)
+    return command_list is None or all(is_builtin_chain(chain) for chain in command_list)
+
+
+def capture_sync(line: str) -> str:
+    """Output of a substitution of builtins only, run right here without a process or the event loop."""
+    buffer = CaptureBuffer()
+    with Subshell():
+        for chain in parse_substitution(line) or ():
+            for result in BuiltinChain().run(chain):
+                buffer.add(result)
+    return buffer.text()
+
+
+class BuiltinPipeline:
+    """Runs a pipeline of builtins on the calling thread, one stage after another.
+
+    Nothing but their stdin is awaited by these builtins, so their generators
+    are stepped directly. The stdout of a stage is kept as the stdin of the
+    next one, and stderr and statuses follow ProcessTaskGroup.
+    """
+
+    def __init__(self) -> None:
+        self.stats: Optional[PipelineStats] = None
+        self.status = 0
+
+    def run(self, command_full: CommandFull) -> Iterator[StreamResult]:
+        if command_full.is_timed or tracer.is_enabled:
+            self.stats = PipelineStats([command.text for command in command_full.commands])
+        commands = command_full.commands
+        stdin: list[bytes] = []
+        for index, command in enumerate(commands[:-1]):
+            stdin = self._buffer_stage(index, command, stdin)
+        last_index = len(commands) - 1
+        yield from filter(any, self._run_stage(last_index, commands[last_index], stdin))
+        if command_full.is_timed and self.stats is not None:
+            yield None, self.stats.report().encode()
+
+    def _buffer_stage(self, index: int, command: CommandOne, stdin: list[bytes]) -> list[bytes]:
+        stdout: list[bytes] = []
+        for stdout_chunk, stderr_chunk in self._run_stage(index, command, stdin):
+            if stdout_chunk:
+                stdout.append(stdout_chunk)
+            writeln(stderr_chunk, is_stdout=False)
+        return stdout
+
+    def _run_stage(self, index: int, command: CommandOne, stdin: list[bytes]) -> Iterator[StreamResult]:
+        if self.stats is not None:
+            self.stats.spawned(index, None, time.perf_counter())
+        self.status = 0
+        outputs = map(capture_sync, substitution_lines(command))
+        # no word may be left, like for `$(true)`, and then nothing runs
+        with suppress(EmptyCommandError):
+            yield from self._run_expanded(index, expand_substitutions(command, outputs), stdin)
+        if self.stats is not None:
+            self.stats.exited(index, self.status)
+
+    def _run_expanded(self, index: int, command: CommandOne, stdin: list[bytes]) -> Iterator[StreamResult]:
+        command = expand_command(command)
+        try:
+            redirections = Redirections.open(command)
+        except RedirectionError as error:
+            yield self._stderr(str(error), Redirections())
+        else:
+            with closing(redirections):
+                handler = DEFAULT_HANDLERS[command.cmd_type]
+                for stdout_str, stderr_str in iterate(handler(command, replay(stdin))):
+                    yield self._stdout(index, stdout_str, redirections)
+                    yield self._stderr(stderr_str, redirections)
+
+    def _stdout(self, index: int, stdout_str: Union[str, bytes, None], redirections: Redirections) -> StreamResult:
+        if not stdout_str:
+            return None, None
+        chunk = stdout_str if isinstance(stdout_str, bytes) else os.fsencode(stdout_str)
+        if self.stats is not None:
+            self.stats.output(index, len(chunk))
+        if redirections.stdout is None:
+            return chunk, None
+        redirections.stdout.write(chunk)
+        return None, None
+
+    def _stderr(self, stderr_str: Optional[str], redirections: Redirections) -> StreamResult:
+        if not stderr_str:
+            return None, None
+        self.status = FAILURE_STATUS
+        chunk = os.fsencode(stderr_str)
+        if redirections.stderr is None:
+            return None, chunk
+        redirections.stderr.write(chunk)
+        return None, None
+
+
+class BuiltinChain:
+    """Runs the pipelines of a chain of builtins on the calling thread, following its && and ||."""
+
+    def __init__(self) -> None:
+        self.status = 0
+
+    def run(self, chain: CommandChain) -> Iterator[StreamResult]:
+        pipelines = chain.pipelines_to_run(lambda: self.status)
+        for pipeline in pipelines:
+            builtin_pipeline = BuiltinPipeline()
+            yield from builtin_pipeline.run(pipeline)
+            self.status = builtin_pipeline.status
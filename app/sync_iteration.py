@@ -0,0 +1,25 @@
+from typing import AsyncIterator, Iterator, TypeVar
+
+from app.types import StdinIterator
+
+ItemType = TypeVar("ItemType")
+
+
+def iterate(iterator: AsyncIterator[ItemType]) -> Iterator[ItemType]:
+    """Steps an async iterator that never suspends, without an event loop."""
+    while True:
+        step = iterator.__anext__()
+        try:
+            step.send(None)  # type: ignore[attr-defined]
+        except StopIteration as stop:
+            yield stop.value
+            continue
+        except StopAsyncIteration:
+            return
+        step.close()  # type: ignore[attr-defined]
+        raise RuntimeError("builtin suspended outside of the event loop")
+
+
+async def replay(chunks: list[bytes]) -> StdinIterator:
+    for chunk in chunks:
+        yield chunk
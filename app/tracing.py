@@ -0,0 +1,201 @@
+import json
+import os
+import resource
+import threading
+import time
+from itertools import count
+from typing import Any, Optional, TextIO
+
+SHELL_TRACE = os.environ.get("SHELL_TRACE", "")
+SECONDS_PER_MINUTE = 60
+NO_VALUE = "-"
+
+
+def format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, SECONDS_PER_MINUTE)
+    return f"{int(minutes)}m{seconds:.3f}s"
+
+
+class Tracer:
+    """Appends events as JSON lines to the file named by SHELL_TRACE.
+
+    The file is opened on the first event, and nothing is done when SHELL_TRACE
+    is unset.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.is_enabled = bool(filename)
+        self.file: Optional[TextIO] = None
+        self.lock = threading.Lock()
+
+    def emit(self, event: str, **fields: Any) -> None:
+        if not self.is_enabled:
+            return
+        line = json.dumps({"event": event, "ts": time.time(), **fields})
+        with self.lock:
+            if self.file is None:
+                try:
+                    self.file = open(self.filename, "a", buffering=1)  # noqa: WPS515
+                except OSError:
+                    self.is_enabled = False
+                    return
+            self.file.write(f"{line}\n")
+
+
+class ParseCounter:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add(self, elapsed_ns: int, length: int) -> None:
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.max_ns = max(self.max_ns, elapsed_ns)
+        tracer.emit("parse", length=length, seconds=elapsed_ns / 1e9)
+
+    def lookup(self, is_hit: bool) -> None:
+        if is_hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def emit_summary(self) -> None:
+        tracer.emit(
+            "parse_summary",
+            count=self.count,
+            seconds=self.total_ns / 1e9,
+            max_seconds=self.max_ns / 1e9,
+            cache_hits=self.cache_hits,
+            cache_misses=self.cache_misses,
+        )
+
+
+class OutputCounter:
+    def __init__(self) -> None:
+        self.chunks = 0
+        self.writes = 0
+        self.byte_count = 0
+
+    def queued(self) -> None:
+        self.chunks += 1
+
+    def written(self, writes: int, size: int) -> None:
+        self.writes += writes
+        self.byte_count += size
+
+    def emit_summary(self) -> None:
+        tracer.emit("output_summary", chunks=self.chunks, writes=self.writes, bytes=self.byte_count)
+
+
+class StageStats:  # noqa: WPS230
+    def __init__(self, index: int, text: str) -> None:
+        self.index = index
+        self.text = text
+        self.spawned_at: float = 0
+        self.first_byte_at: Optional[float] = None
+        self.exited_at: Optional[float] = None
+        self.bytes = 0
+        self.stdin_wait: float = 0
+
+    def row(self) -> str:
+        real = NO_VALUE
+        if self.exited_at is not None:
+            real = format_seconds(self.exited_at - self.spawned_at)
+        first_byte = NO_VALUE
+        if self.first_byte_at is not None:
+            first_byte = format_seconds(self.first_byte_at - self.spawned_at)
+        columns = [
+            str(self.index + 1),
+            real,
+            first_byte,
+            str(self.bytes),
+            format_seconds(self.stdin_wait),
+            self.text,
+        ]
+        return "\t".join(columns)
+
+
+class PipelineStats:
+    """Timings and byte counts of one pipeline, for `time` and SHELL_TRACE.
+
+    asyncio's child watcher reaps the processes and drops their rusage, so
+    user and sys time are only given for the whole pipeline, like bash does:
+    the growth of RUSAGE_SELF and RUSAGE_CHILDREN while it ran. Stages
+    connected by a kernel pipe never pass data through the shell, so only
+    the stages it reads from get a first byte and a byte count.
+    """
+
+    ids = count(1)
+
+    def __init__(self, texts: list[str]) -> None:
+        self.id = next(self.ids)
+        self.stages = [StageStats(index, text) for index, text in enumerate(texts)]
+        self.started_at = time.perf_counter()
+        self.self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        self.children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    def spawned(self, index: int, pid: Optional[int], started_at: float) -> None:
+        stage = self.stages[index]
+        stage.spawned_at = started_at
+        tracer.emit(
+            "spawn",
+            pipeline=self.id,
+            stage=index,
+            pid=pid,
+            command=stage.text,
+        )
+
+    def output(self, index: int, size: int) -> None:
+        stage = self.stages[index]
+        if stage.first_byte_at is None:
+            stage.first_byte_at = time.perf_counter()
+            tracer.emit("first_byte", pipeline=self.id, stage=index)
+        stage.bytes += size
+
+    def waited(self, index: int, seconds: float) -> None:
+        self.stages[index].stdin_wait += seconds
+
+    def exited(self, index: int, returncode: int) -> None:
+        stage = self.stages[index]
+        stage.exited_at = time.perf_counter()
+        tracer.emit(
+            "exit",
+            pipeline=self.id,
+            stage=index,
+            returncode=returncode,
+            real=stage.exited_at - stage.spawned_at,
+            bytes=stage.bytes,
+            stdin_wait=stage.stdin_wait,
+        )
+
+    def report(self) -> str:
+        real = time.perf_counter() - self.started_at
+        user_time, system_time = self._cpu_times()
+        lines = [
+            "",
+            f"real\t{format_seconds(real)}",
+            f"user\t{format_seconds(user_time)}",
+            f"sys\t{format_seconds(system_time)}",
+            "stage\treal\tfirst\tbytes\tblocked\tcommand",
+        ]
+        lines.extend(stage.row() for stage in self.stages)
+        return "{}\n".format("\n".join(lines))
+
+    def _cpu_times(self) -> tuple[float, float]:
+        """User and sys time of the shell and of the children it reaped since the pipeline started."""
+        self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        user_time = self_usage.ru_utime - self.self_usage.ru_utime
+        user_time += children_usage.ru_utime - self.children_usage.ru_utime
+        system_time = self_usage.ru_stime - self.self_usage.ru_stime
+        system_time += children_usage.ru_stime - self.children_usage.ru_stime
+        return user_time, system_time
+
+
+tracer = Tracer(SHELL_TRACE)
+parse_counter = ParseCounter()
+output_counter = OutputCounter()
@@ -1,4 +1,9 @@
-from typing import AsyncIterator, Optional
+from typing import AsyncIterator, Optional, Union
 
 CommandResult = tuple[Optional[str], Optional[str]]
-CommandResultAsyncIterator = AsyncIterator[CommandResult]
+# builtins passing file contents through yield their stdout as bytes
+BuiltinResult = tuple[Union[str, bytes, None], Optional[str]]
+StreamResult = tuple[Optional[bytes], Optional[bytes]]
+StreamResultAsyncIterator = AsyncIterator[StreamResult]
+StdinIterator = AsyncIterator[bytes]
+BuiltinOutput = AsyncIterator[BuiltinResult]
@@ -0,0 +1,70 @@
+import mmap
+import os
+from operator import methodcaller
+from typing import AsyncIterator, Callable, Iterator
+
+from app.command import CommandOne
+from app.coreutils import STDIN_NAME, is_option, read_chunks
+from app.subshell import resolve
+from app.types import BuiltinOutput, StdinIterator
+
+MMAP_BLOCK = 1 << 20
+WC_OPTIONS = frozenset(("-l", "-w", "-c"))
+NEW_LINE = b"\n"
+
+
+def supports_wc(args: tuple[str, ...]) -> bool:
+    options = [arg for arg in args if is_option(arg)]
+    if len(options) != 1 or len(args) > 2:
+        return False
+    return options[0] in WC_OPTIONS
+
+
+def _mapped_blocks(filename: str) -> Iterator[bytes]:
+    with open(resolve(filename), "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for start in range(0, len(data), MMAP_BLOCK):
+                yield data[start : start + MMAP_BLOCK]
+
+
+async def _blocks(filename: str, stdin: StdinIterator) -> AsyncIterator[bytes]:
+    if filename == STDIN_NAME:
+        async for chunk in read_chunks(filename, stdin):
+            yield chunk
+        return
+    for block in _mapped_blocks(filename):
+        yield block
+
+
+async def _count_words(blocks: AsyncIterator[bytes]) -> int:
+    total = 0
+    is_in_word = False
+    async for block in blocks:
+        words = block.split()
+        total += len(words)
+        # a word cut by the end of the previous block is counted once
+        if words and is_in_word and not block[:1].isspace():
+            total -= 1
+        is_in_word = not block[-1:].isspace()
+    return total
+
+
+async def _count(option: str, blocks: AsyncIterator[bytes]) -> int:
+    if option == "-w":
+        return await _count_words(blocks)
+    measure: Callable[[bytes], int] = len if option == "-c" else methodcaller("count", NEW_LINE)
+    return sum([measure(block) async for block in blocks])
+
+
+async def do_wc(command: CommandOne, stdin: StdinIterator) -> BuiltinOutput:
+    option = next(arg for arg in command.args if is_option(arg))
+    filenames = [arg for arg in command.args if not is_option(arg)]
+    filename = filenames[0] if filenames else STDIN_NAME
+    try:
+        total = await _count(option, _blocks(filename, stdin))
+    except OSError as error:
+        yield None, f"wc: {filename}: {error.strerror}\n"
+        return
+    yield (f"{total} {filename}\n" if filenames else f"{total}\n"), None
@@ -0,0 +1,88 @@
+import errno
+import os
+from functools import lru_cache
+from itertools import chain
+from typing import Iterable, Iterator, Optional
+
+from app.command import CommandOne
+from app.directory_cache import directory_cache
+from app.lexer import has_glob
+from app.subshell import resolve
+
+POINTER_SIZE = 8
+SEPARATOR = "/"
+
+
+def _exists(path: str) -> bool:
+    return os.path.lexists(resolve(path))
+
+
+def _expand(prefix: str, components: list[str]) -> Iterator[str]:
+    component, *rest = components
+    paths: Iterable[str]
+    if has_glob(component):
+        names = directory_cache.matching(resolve(prefix or os.curdir), component)
+        paths = (f"{prefix}{name}" for name in names)
+    else:
+        paths = filter(_exists, (f"{prefix}{component}",))
+    if not rest:
+        return iter(paths)
+    directories = (path for path in paths if os.path.isdir(resolve(path)))
+    return chain.from_iterable(_expand(f"{path}{SEPARATOR}", rest) for path in directories)
+
+
+def expand_pattern(pattern: str) -> Iterator[str]:
+    """Paths matching pattern, in the order of the sorted listings they come from."""
+    if pattern.startswith(SEPARATOR):
+        return _expand(SEPARATOR, pattern[1:].split(SEPARATOR))
+    return _expand("", pattern.split(SEPARATOR))
+
+
+def _expand_word(word: str, pattern: Optional[str]) -> Iterator[str]:
+    if pattern is None:
+        yield word
+        return
+    is_matched = False
+    for path in expand_pattern(pattern):
+        is_matched = True
+        yield path
+    if not is_matched:
+        yield word
+
+
+@lru_cache(maxsize=1)
+def arg_max() -> int:
+    # nothing in the shell changes its own environment, so it is measured once
+    environment = sum(
+        len(key) + len(value) + 2 + POINTER_SIZE
+        for key, value in os.environb.items()
+    )
+    return os.sysconf("SC_ARG_MAX") - environment
+
+
+def _within_arg_max(args: Iterable[str]) -> Iterator[str]:
+    limit = arg_max()
+    size = 0
+    for arg in args:
+        size += len(os.fsencode(arg)) + 1 + POINTER_SIZE
+        if size > limit:
+            raise OSError(errno.E2BIG, os.strerror(errno.E2BIG))
+        yield arg
+
+
+def expand_command(command: CommandOne, is_exec: bool = False) -> CommandOne:
+    """The command with every pattern word replaced by its matches, or left as is when nothing matches.
+
+    Matches are consumed one at a time, so for a command that is executed
+    an expansion past ARG_MAX fails with E2BIG before the rest of it is built.
+    """
+    if not command.patterns:
+        return command
+    patterns = dict(command.patterns)
+    args: Iterable[str] = chain.from_iterable(
+        _expand_word(word, patterns.get(index))
+        for index, word in enumerate(command.tokens)
+    )
+    if is_exec:
+        args = _within_arg_max(args)
+    return command.with_words(tuple(args))
@@ -0,0 +1,126 @@
+"""Runs the benchmark suites and writes the results as one JSON document.
+
+    python -m benchmarks [-o FILE] [--compare BASELINE] [--threshold 0.1] [--pipeline-bytes N] [SUITE ...]
+
+Without SUITE arguments every suite runs. With --compare, each result is
+matched by suite and name against a previous document, the per-operation
+ratios are printed to stderr, and the exit status is 1 when any of them got
+slower by more than the threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from functools import partial
+from importlib import import_module
+from typing import Any, Callable, Iterator
+
+from benchmarks import bench_pipeline
+from benchmarks.common import BenchResult
+
+DEFAULT_THRESHOLD = 0.1
+RESULT_LABEL = "{0[suite]}.{0[name]}"
+SUITE_MODULE = "benchmarks.bench_{0}"
+SUITES = (
+    "parser",
+    "event_loop",
+    "process",
+    "pipeline",
+    "completion",
+    "history",
+    "wildcard",
+    "startup",
+    "server",
+    "main",
+)
+
+
+def metadata() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+    return {
+        "timestamp": time.time(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def ratios(results: list[BenchResult], baseline_file: str) -> Iterator[tuple[str, float]]:
+    with open(baseline_file) as file:
+        previous_results = json.load(file)["results"]
+    baseline = {RESULT_LABEL.format(result): float(result["per_op_us"]) for result in previous_results}
+    for result in results:
+        label = RESULT_LABEL.format(result)
+        if baseline.get(label):
+            yield label, float(result["per_op_us"]) / baseline[label]
+
+
+def compare(results: list[BenchResult], baseline_file: str, threshold: float) -> bool:
+    is_regressed = False
+    for label, ratio in ratios(results, baseline_file):
+        marker = ""
+        if ratio > 1 + threshold:
+            marker = "  REGRESSION"
+            is_regressed = True
+        sys.stderr.write(f"{label}\t{ratio:.2f}x{marker}\n")
+    return is_regressed
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("suites", nargs="*", metavar="SUITE")
+    parser.add_argument("-o", "--output", help="write the JSON document here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON document of an earlier run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--pipeline-bytes", type=int, default=bench_pipeline.DEFAULT_BYTES)
+    return parser
+
+
+def select_suites(parser: argparse.ArgumentParser, args: argparse.Namespace) -> list[str]:
+    unknown = set(args.suites).difference(SUITES)
+    if unknown:
+        unknown_names = ", ".join(sorted(unknown))
+        choices = ", ".join(SUITES)
+        parser.error(f"unknown suites: {unknown_names}; choose from {choices}")
+    return [name for name in SUITES if not args.suites or name in args.suites]
+
+
+def run_suites(names: list[str], args: argparse.Namespace) -> list[BenchResult]:
+    # suites are imported only when selected, so running one does not pay for the others
+    results: list[BenchResult] = []
+    for name in names:
+        sys.stderr.write(f"running {name}\n")
+        collect: Callable[..., list[BenchResult]] = import_module(SUITE_MODULE.format(name)).collect
+        if name == "pipeline":
+            collect = partial(collect, args.pipeline_bytes)
+        results.extend({"suite": name, **result} for result in collect())
+    return results
+
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+    results = run_suites(select_suites(parser, args), args)
+    document = json.dumps({"meta": metadata(), "results": results}, indent=1)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(f"{document}\n")
+    else:
+        sys.__stdout__.write(f"{document}\n")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Tab completion latency with a large synthetic PATH.
+
+    python -m benchmarks.bench_completion
+
+Builds PATH_DIRS directories of FILES_PER_DIR executables in a temporary
+directory and measures building the index from scratch, answering a prefix
+query from a warm index, and walking every readline state of one query.
+"""
+
+import os
+import tempfile
+from functools import partial
+from pathlib import Path
+from unittest.mock import patch
+
+from app.completion_index import CompletionIndex
+from app.completer import completer
+from benchmarks.common import BenchResult, measure, report
+
+PATH_DIRS = 20
+FILES_PER_DIR = 2500
+PREFIXES = ("cmd0", "cmd12", "tool_3", "x", "")
+
+
+def make_executables(path_dir: Path, suffix: int) -> None:
+    path_dir.mkdir()
+    for file_index in range(FILES_PER_DIR):
+        prefix = "cmd" if file_index % 2 else "tool_"
+        number = str(file_index).zfill(5)
+        (path_dir / f"{prefix}{number}_{suffix}").touch(mode=0o755)
+
+
+def populate(root: Path) -> str:
+    path_dirs = [root / f"bin{dir_index}" for dir_index in range(PATH_DIRS)]
+    for dir_index, path_dir in enumerate(path_dirs):
+        make_executables(path_dir, dir_index)
+    return os.pathsep.join(map(str, path_dirs))
+
+
+def cold_index(text: str) -> None:
+    CompletionIndex().complete(text, 0)
+
+
+def warm_queries() -> None:
+    for text in PREFIXES:
+        completer(text, 0)
+
+
+def walk_states(text: str) -> None:
+    state = 0
+    while completer(text, state) is not None:
+        state += 1
+
+
+def collect() -> list[BenchResult]:
+    with tempfile.TemporaryDirectory() as root:
+        with patch.dict(os.environ, {"PATH": populate(Path(root))}):
+            warm_queries()
+            results = [
+                measure("index_build_cold", partial(cold_index, "cmd0"), repeat=3),
+                measure("prefix_query_warm", warm_queries, number=20, ops_per_call=len(PREFIXES)),
+                measure("walk_all_states", partial(walk_states, "cmd012"), number=5),
+            ]
+    for result in results:
+        result["executables"] = PATH_DIRS * FILES_PER_DIR
+    return results
+
+
+def main() -> None:
+    report(collect())
+
+
+if __name__ == "__main__":
+    main()
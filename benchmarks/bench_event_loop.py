@@ -0,0 +1,48 @@
+"""Per-command overhead of asyncio.run() versus the session-wide event loop.
+
+    python -m benchmarks.bench_event_loop
+"""
+
+import asyncio
+from functools import partial
+
+from app.command import CommandChain, CommandList
+from app.event_loop import EventLoopThread
+from app.jobs import Job
+from app.executor import wrapper
+from benchmarks.common import BenchResult, measure, report, silenced_stdout
+
+LINES = 10_000
+
+
+def run_per_line(commands: list[CommandChain]) -> None:
+    for command in commands:
+        asyncio.run(wrapper(command, Job(command.text, job_control=False)))
+
+
+def run_persistent(commands: list[CommandChain]) -> None:
+    event_loop = EventLoopThread()
+    for command in commands:
+        event_loop.run(wrapper(command, Job(command.text, job_control=False)))
+    event_loop.close()
+
+
+RUNNERS = (("asyncio_run_per_line", run_per_line), ("persistent_loop", run_persistent))
+
+
+def collect() -> list[BenchResult]:
+    commands = [CommandList(f"echo line {index}").chains[0] for index in range(LINES)]
+    results: list[BenchResult] = []
+    with silenced_stdout():
+        for name, runner in RUNNERS:
+            run_lines = partial(runner, commands)
+            results.append(measure(name, run_lines, repeat=3, ops_per_call=LINES))
+    return results
+
+
+def main() -> None:
+    report(collect())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Loading and searching large history files.
+
+    python -m benchmarks.bench_history
+
+Writes history files of each size in SIZES to a temporary directory and
+measures opening the store without and with its offset index, `history -r`
+(read_history), and a substring search over every entry.
+"""
+
+import os
+import readline
+import tempfile
+from collections import deque
+from functools import partial
+
+from app.history import read_history
+from app.history_store import INDEX_SUFFIX, HistoryStore
+from benchmarks.common import BenchResult, measure, report
+
+SIZES = (100_000, 1_000_000)
+
+
+def write_history_file(filename: str, size: int) -> None:
+    with open(filename, "w") as file:
+        for index in range(size):
+            target = index % 97
+            file.write(f"git commit -m 'change {index}' && make test TARGET=t{target}\n")
+
+
+def open_cold(filename: str) -> None:
+    os.unlink(f"{filename}{INDEX_SUFFIX}")
+    HistoryStore(filename)
+
+
+def read_into_readline(filename: str) -> None:
+    readline.clear_history()
+    read_history(filename)
+
+
+def search(store: HistoryStore) -> None:
+    deque(store.search("TARGET=t42"), maxlen=0)
+
+
+def measure_size(root: str, size: int) -> list[BenchResult]:
+    filename = os.path.join(root, f"history_{size}")
+    write_history_file(filename, size)
+    HistoryStore(filename)
+    results = [
+        measure(f"open_cold_{size}", partial(open_cold, filename), repeat=3),
+        measure(f"open_warm_{size}", partial(HistoryStore, filename)),
+        measure(f"read_history_{size}", partial(read_into_readline, filename)),
+        measure(f"search_{size}", partial(search, HistoryStore(filename)), repeat=3),
+    ]
+    for result in results:
+        result["entries"] = size
+    return results
+
+
+def collect() -> list[BenchResult]:
+    with tempfile.TemporaryDirectory() as root:
+        results = [result for size in SIZES for result in measure_size(root, size)]
+    readline.clear_history()
+    return results
+
+
+def main() -> None:
+    report(collect())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""End-to-end runs of `python -m app.main` in batch mode; start-up is in bench_startup.
+
+    python -m benchmarks.bench_main
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from functools import partial
+from typing import Optional
+
+from benchmarks.common import BenchResult, measure, report
+
+BUILTIN_LINES = 2000
+EXTERNAL_LINES = 200
+COREUTILS_LINES = 50
+COREUTILS_COMMANDS = ("cat {0} | head -n 5", "wc -l {0}", r"printf '%s\n' done", "true", "")
+COREUTILS_SCRIPT = "\n".join(COREUTILS_COMMANDS)
+OUTPUT_SCRIPT = "echo line {0}\necho line {0} | cat\n"
+
+
+def run_shell(
+    args: list[str],
+    script: str = "",
+    env: Optional[dict[str, str]] = None,
+) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "app.main", *args],
+        input=script.encode(),
+        stdout=subprocess.DEVNULL,
+        env=env,
+        check=True,
+    )
+
+
+def measure_coreutils(label: str, switch: str, script: str) -> BenchResult:
+    env = {**os.environ, "SHELL_NATIVE_UTILS": switch}
+    run = partial(run_shell, [], script, env)
+    return measure(f"script_coreutils_{label}", run, repeat=3, ops_per_call=COREUTILS_LINES)
+
+
+def coreutils_results() -> list[BenchResult]:
+    """The same coreutils lines run as external binaries and as native builtins."""
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as file:
+        file.writelines(f"line {index}\n" for index in range(BUILTIN_LINES))
+        file.flush()
+        script = COREUTILS_SCRIPT.format(file.name) * COREUTILS_LINES
+        return [
+            measure_coreutils("external", "0", script),
+            measure_coreutils("native", "1", script),
+        ]
+
+
+def measure_output(label: str, buffer_size: str, script: str, trace_file: str) -> BenchResult:
+    """One run of script, with the chunk and write counts of its output_summary event."""
+    env = {**os.environ, "SHELL_OUTPUT_BUFFER_SIZE": buffer_size, "SHELL_TRACE": trace_file}
+    result = measure(
+        f"script_output_{label}",
+        partial(run_shell, [], script, env),
+        repeat=3,
+        ops_per_call=EXTERNAL_LINES,
+    )
+    with open(trace_file) as trace:
+        events = map(json.loads, reversed(trace.readlines()))
+        summary = next(event for event in events if event["event"] == "output_summary")
+    return {**result, "chunks": summary["chunks"], "writes": summary["writes"]}
+
+
+def output_results() -> list[BenchResult]:
+    """Lines from builtins and processes written one chunk at a time and coalesced, with their write counts."""
+    script = "".join(OUTPUT_SCRIPT.format(index) for index in range(EXTERNAL_LINES))
+    with tempfile.TemporaryDirectory() as directory:
+        trace_file = os.path.join(directory, "trace.jsonl")
+        return [
+            measure_output("unbuffered", "1", script, trace_file),
+            measure_output("coalesced", "", script, trace_file),
+        ]
+
+
+def collect() -> list[BenchResult]:
+    builtin_script = "".join(f"echo line {index}\n" for index in range(BUILTIN_LINES))
+    repeated_script = "echo same line | echo other > /dev/null\n" * BUILTIN_LINES
+    external_script = "true\n" * EXTERNAL_LINES
+    substitution_script = "echo $(pwd)/$(echo file)\n" * BUILTIN_LINES
+    return [
+        measure("script_builtins", partial(run_shell, [], builtin_script), repeat=3, ops_per_call=BUILTIN_LINES),
+        measure("script_repeated", partial(run_shell, [], repeated_script), repeat=3, ops_per_call=BUILTIN_LINES),
+        measure("script_externals", partial(run_shell, [], external_script), repeat=3, ops_per_call=EXTERNAL_LINES),
+        measure(
+            "script_substitution", partial(run_shell, [], substitution_script), repeat=3, ops_per_call=BUILTIN_LINES
+        ),
+        *coreutils_results(),
+        *output_results(),
+    ]
+
+
+def main() -> None:
+    report(collect())
+
+
+if __name__ == "__main__":
+    main()
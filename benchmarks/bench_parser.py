@@ -0,0 +1,76 @@
+"""CommandParser throughput over a corpus of real command lines.
+
+    python -m benchmarks.bench_parser
+"""
+
+from functools import partial
+
+from app.command import CommandFull, CommandList, ParseCache
+from app.lexer import CommandParser
+from benchmarks.common import BenchResult, measure, report
+
+CORPUS = (
+    "ls -la /var/log",
+    "cd ~/projects/shell",
+    "echo 'hello   world' \"and $HOME\" plain\\ escaped",  # noqa: WPS342
+    "cat /etc/passwd | grep root | cut -d: -f1",
+    "zcat big.log.gz | grep -v DEBUG | sort | uniq -c | sort -rn | head -20 > top.txt",
+    "find . -name '*.py' -newer setup.py 2>> errors.log",
+    "git log --format='%h %an %s' --since=\"2 weeks ago\"",
+    'printf "%s\\t%s\\n" "key with spaces" \'value "quoted"\' >> table.tsv',  # noqa: WPS342
+    "type echo cat ls nonexistent_command",
+    "history 20",
+)
+QUOTE_HEAVY_WORDS = " ".join(("'single {0}'", r'"double \" {0}"', r"esc\ aped{0}"))
+QUOTE_HEAVY = " ".join(map(QUOTE_HEAVY_WORDS.format, range(2000)))
+LONG_ARGUMENT = "x" * 100_000
+
+
+def parse_corpus(lines: tuple[str, ...]) -> None:
+    for line in lines:
+        CommandParser(line)
+
+
+def build_pipelines(lines: tuple[str, ...]) -> None:
+    for line in lines:
+        CommandFull.from_line(line)
+
+
+def build_corpus(lines: tuple[str, ...]) -> None:
+    for line in lines:
+        CommandList(line)
+
+
+def parse_cached(cache: ParseCache, lines: tuple[str, ...]) -> None:
+    for line in lines:
+        cache.parse(line)
+
+
+def collect() -> list[BenchResult]:
+    long_lines = (
+        f"echo {LONG_ARGUMENT}",
+        f"echo '{LONG_ARGUMENT}'",
+        f'echo "{LONG_ARGUMENT}"',
+    )
+    corpus_size = len(CORPUS)
+    return [
+        measure("parse_corpus", partial(parse_corpus, CORPUS), number=1000, ops_per_call=corpus_size),
+        measure("command_full_corpus", partial(build_pipelines, CORPUS), number=1000, ops_per_call=corpus_size),
+        measure("command_list_corpus", partial(build_corpus, CORPUS), number=1000, ops_per_call=corpus_size),
+        measure(
+            "parse_cache_hit_corpus",
+            partial(parse_cached, ParseCache(), CORPUS),
+            number=1000,
+            ops_per_call=corpus_size,
+        ),
+        measure("parse_100k_arguments", partial(parse_corpus, long_lines), number=10, ops_per_call=len(long_lines)),
+        measure("parse_quote_heavy", partial(parse_corpus, (QUOTE_HEAVY,)), number=10),
+    ]
+
+
+def main() -> None:
+    report(collect())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Throughput of a pipeline whose output is consumed by the shell.
+
+    python -m benchmarks.bench_pipeline [BYTES]
+
+Streams BYTES (1 GiB by default) from /dev/zero through `cat | cat` and
+counts what process_full yields. The slow consumer case pauses every
+SLOW_EVERY chunks and records the most output the shell held at once.
+"""
+
+import asyncio
+import sys
+from functools import partial
+
+from app.async_command_processor import ProcessTaskGroup, process_full
+from app.command import CommandFull
+from benchmarks.common import BenchResult, measure, report
+
+DEFAULT_BYTES = 1 << 30
+MIB = 1 << 20
+SLOW_BYTES = 1 << 26
+SLOW_EVERY = 8
+SLOW_PAUSE = 0.001
+
+
+async def consume(command: CommandFull) -> int:
+    sizes = [len(stdout or b"") async for stdout, _ in process_full(command)]
+    return sum(sizes)
+
+
+def run(command: CommandFull, size: int) -> None:
+    total = asyncio.run(consume(command))
+    if total != size:
+        raise RuntimeError(f"expected {size} bytes, got {total}")
+
+
+async def consume_slowly(command: CommandFull) -> int:
+    task_group = ProcessTaskGroup()
+    peak = 0
+    chunks = 0
+    async for _ in task_group.run(command):
+        peak = max(peak, task_group.results.stdout_marks.size)
+        chunks += 1
+        if chunks % SLOW_EVERY == 0:
+            await asyncio.sleep(SLOW_PAUSE)
+    return peak
+
+
+def run_slowly(command: CommandFull, peaks: list[int]) -> None:
+    peaks.append(asyncio.run(consume_slowly(command)))
+
+
+def collect(size: int = DEFAULT_BYTES) -> list[BenchResult]:
+    command = CommandFull.from_line(f"head -c {size} /dev/zero | cat | cat")
+    result: BenchResult = measure("cat_cat_throughput", partial(run, command, size), repeat=3)
+    result["bytes"] = size
+    result["mib_per_s"] = size / float(result["best_s"]) / MIB
+    slow_command = CommandFull.from_line(f"head -c {SLOW_BYTES} /dev/zero")
+    peaks: list[int] = []
+    slow: BenchResult = measure("slow_consumer", partial(run_slowly, slow_command, peaks), repeat=3)
+    slow["bytes"] = SLOW_BYTES
+    slow["peak_buffered_bytes"] = max(peaks)
+    return [result, slow]
+
+
+def main() -> None:
+    size = DEFAULT_BYTES
+    if len(sys.argv) > 1:
+        size = int(sys.argv[1])
+    report(collect(size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Pipeline latency of depth 1 to 8: builtin-only and external ones through
+process_full, and builtin-only ones through the synchronous BuiltinPipeline.
+
+    python -m benchmarks.bench_process
+"""
+
+import asyncio
+from contextlib import closing
+from functools import partial
+from itertools import repeat
+from typing import Callable, Iterator
+
+from app.async_command_processor import process_full
+from app.command import CommandFull
+from app.sync_command_processor import BuiltinPipeline
+from app.types import StreamResult
+from benchmarks.common import BenchResult, measure, report
+
+DEPTHS = range(1, 9)
+BUILTIN_RUNS = 200
+EXTERNAL_RUNS = 20
+Case = tuple[str, Callable[[], object], int]
+
+
+async def drain(command: CommandFull) -> list[StreamResult]:
+    return [result async for result in process_full(command)]
+
+
+def builtin_pipeline(depth: int) -> CommandFull:
+    return CommandFull.from_line(" | ".join(repeat("echo payload", depth)))
+
+
+def run(loop: asyncio.AbstractEventLoop, command: CommandFull) -> None:
+    loop.run_until_complete(drain(command))
+
+
+def run_sync(command: CommandFull) -> list[StreamResult]:
+    return list(BuiltinPipeline().run(command))
+
+
+def cases(loop: asyncio.AbstractEventLoop) -> Iterator[Case]:
+    for depth in DEPTHS:
+        yield f"builtin_depth_{depth}", partial(run, loop, builtin_pipeline(depth)), BUILTIN_RUNS
+    for depth in DEPTHS:
+        stages = ["printf payload", *repeat("cat", depth - 1)]
+        external = CommandFull.from_line(" | ".join(stages))
+        yield f"external_depth_{depth}", partial(run, loop, external), EXTERNAL_RUNS
+    for depth in DEPTHS:
+        yield f"builtin_sync_depth_{depth}", partial(run_sync, builtin_pipeline(depth)), BUILTIN_RUNS
+
+
+def collect() -> list[BenchResult]:
+    with closing(asyncio.new_event_loop()) as loop:
+        return [
+            measure(name, func, number=number)
+            for name, func, number in cases(loop)
+        ]
+
+
+def main() -> None:
+    report(collect())
+
+
+if __name__ == "__main__":
+    main()
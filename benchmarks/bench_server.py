@@ -0,0 +1,58 @@
+"""Invocations of `python -m app.client` against a server started for the benchmark.
+
+    python -m benchmarks.bench_server
+
+Runs the command lines of bench_startup, whose wall_* results are the same
+lines started cold with `python -m app.main`.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from typing import Iterator
+
+from benchmarks.bench_startup import COMMANDS
+from benchmarks.common import BenchResult, measure, report
+
+SERVER_START_TIMEOUT = 10
+POLL_INTERVAL = 0.01
+
+
+def run_client(script: str, env: dict[str, str]) -> None:
+    command = [sys.executable, "-m", "app.client", "-c", script]
+    subprocess.run(command, stdout=subprocess.DEVNULL, env=env, check=True)
+
+
+@contextmanager
+def running_server(socket_path: str) -> Iterator[dict[str, str]]:
+    """Environment for clients of a server listening on socket_path until the block ends."""
+    env = {**os.environ, "SHELL_SERVER_SOCKET": socket_path}
+    with ExitStack() as stack:
+        command = [sys.executable, "-m", "app.server"]
+        server = stack.enter_context(subprocess.Popen(command, env=env))
+        stack.callback(server.terminate)
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while not os.path.exists(socket_path) and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+        yield env
+
+
+def collect() -> list[BenchResult]:
+    with tempfile.TemporaryDirectory() as directory:
+        with running_server(os.path.join(directory, "shell.sock")) as env:
+            return [
+                measure(f"client_{label}", partial(run_client, script, env), number=10)
+                for label, script in COMMANDS.items()
+            ]
+
+
+def main() -> None:
+    report(collect())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Start-up cost of `python -m app.main`: wall clock and `-X importtime`.
+
+    python -m benchmarks.bench_startup
+
+The importtime results sum the self time of every module imported while
+running each command line and report the cumulative time of TRACKED
+modules, 0 when a run never imported them.
+"""
+
+import subprocess
+import sys
+from functools import partial
+from types import MappingProxyType
+from typing import Optional
+
+from benchmarks.common import BenchResult, measure, report
+
+COMMANDS = MappingProxyType(
+    {
+        "empty": "",
+        "echo": "echo hi",
+        "external": "true",
+    }
+)
+TRACKED = ("asyncio", "readline", "app.builtin", "app.async_command_processor")
+IMPORTTIME_RUNS = 5
+
+
+def run_shell(script: str) -> None:
+    command = [sys.executable, "-m", "app.main", "-c", script]
+    subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+
+
+def run_interpreter() -> None:
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+
+
+def parse_import_time(line: str) -> Optional[tuple[str, int, int]]:
+    """Module name, self and cumulative microseconds of one `-X importtime` line."""
+    if not line.startswith("import time:") or line.endswith("| imported package"):
+        return None
+    self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+    if not self_us.strip().isdigit():
+        return None
+    return module.strip(), int(self_us), int(cumulative_us)
+
+
+def import_times(script: str) -> dict[str, int]:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "app.main", "-c", script],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    ).stderr
+    times = {"total": 0}
+    for module, self_us, cumulative_us in filter(None, map(parse_import_time, stderr.splitlines())):
+        times["total"] += self_us
+        times[module] = cumulative_us
+    return times
+
+
+def importtime_results(label: str, script: str) -> list[BenchResult]:
+    runs = [import_times(script) for _ in range(IMPORTTIME_RUNS)]
+    results: list[BenchResult] = []
+    for module in ("total", *TRACKED):
+        best = min(run.get(module, 0) for run in runs)
+        results.append({"name": f"importtime_{label}_{module}", "repeat": IMPORTTIME_RUNS, "per_op_us": best})
+    return results
+
+
+def collect() -> list[BenchResult]:
+    results = [measure("interpreter", run_interpreter, number=10)]
+    for label, script in COMMANDS.items():
+        results.append(measure(f"wall_{label}", partial(run_shell, script), number=10))
+        results.extend(importtime_results(label, script))
+    return results
+
+
+def main() -> None:
+    report(collect())
+
+
+if __name__ == "__main__":
+    main()
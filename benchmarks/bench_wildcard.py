@@ -0,0 +1,65 @@
+"""Pathname expansion in a directory of FILES entries.
+
+    python -m benchmarks.bench_wildcard
+
+Measures listing the directory from scratch, and expanding a pattern with a
+literal prefix and one that has to match every name, both from the cached
+listing.
+"""
+
+import contextlib
+import tempfile
+from functools import partial
+from pathlib import Path
+
+from app.command import CommandFull
+from app.directory_cache import directory_cache
+from app.wildcard import expand_command
+from benchmarks.common import BenchResult, measure, report
+
+FILES = 200_000
+NAME_FORMAT = "shard-{0:06d}"
+
+
+def populate(root: str) -> None:
+    for index in range(FILES):
+        Path(root, NAME_FORMAT.format(index)).touch()
+
+
+def expand_cold(command: CommandFull) -> None:
+    directory_cache.clear()
+    expand_command(command.last_command, is_exec=True)
+
+
+def expand_warm(command: CommandFull) -> None:
+    expand_command(command.last_command, is_exec=True)
+
+
+def measure_expansion() -> list[BenchResult]:
+    prefix_pattern = CommandFull.from_line("ls shard-01999*")
+    full_scan = CommandFull.from_line("ls *-01999?")
+    expand_warm(prefix_pattern)
+    return [
+        measure("listing_cold", partial(expand_cold, prefix_pattern), repeat=3),
+        measure("prefix_pattern_warm", partial(expand_warm, prefix_pattern), number=1000),
+        measure("full_scan_warm", partial(expand_warm, full_scan), number=5),
+    ]
+
+
+def collect() -> list[BenchResult]:
+    with tempfile.TemporaryDirectory() as root:
+        populate(root)
+        with contextlib.chdir(root):
+            results = measure_expansion()
+    directory_cache.clear()
+    for result in results:
+        result["files"] = FILES
+    return results
+
+
+def main() -> None:
+    report(collect())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import json
+import os
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Iterator
+
+from app.output import STDOUT_FD, output
+
+BenchResult = dict[str, float | int | str]
+
+
+def measure(
+    name: str,
+    func: Callable[[], object],
+    number: int = 1,
+    repeat: int = 5,
+    ops_per_call: int = 1,
+) -> BenchResult:
+    timings: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):  # noqa: WPS440
+            func()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "name": name,
+        "number": number,
+        "repeat": repeat,
+        "best_s": best,
+        "mean_s": sum(timings) / repeat,
+        "per_op_us": best / (number * ops_per_call) * 1e6,
+    }
+
+
+def report(results: list[BenchResult]) -> None:
+    for result in results:
+        sys.__stdout__.write("{}\n".format(json.dumps(result)))
+
+
+@contextmanager
+def silenced_stdout() -> Iterator[None]:
+    """Sends fd 1 to /dev/null, since the shell's output sink writes to the descriptor directly."""
+    sys.stdout.flush()
+    saved_fd = os.dup(STDOUT_FD)
+    with ExitStack() as stack:
+        stack.callback(os.close, saved_fd)
+        stack.callback(os.dup2, saved_fd, STDOUT_FD)
+        stack.callback(output.flush)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, STDOUT_FD)
+        os.close(devnull)
+        yield